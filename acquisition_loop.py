@@ -0,0 +1,214 @@
+import re
+import threading
+from metrics import METRICS
+from sampling_scheduler import SamplingScheduler, DeviceClock
+
+
+class AcquisitionLoop:
+    """Connection handling and the read loop for one ESP32, without Qt
+
+    run() blocks the calling thread: it connects in the background as soon as
+    it starts and reconnects with exponential backoff whenever the link drops.
+    Samples go to the sinks first and then to the on_sample callback. The
+    GUI runs it inside AcquisitionWorker; the headless daemon calls run()
+    directly.
+
+    Polled reads are paced by a SamplingScheduler, so ticks do not drift by
+    the time each read takes. Samples are stamped with the time their frame
+    arrived, or, when the board sends its millis(), with the device time
+    mapped onto the host clock through a DeviceClock.
+
+    Tick lateness, skipped ticks, the time spent in the sinks and the
+    host/device clock offset (gauge clock_offset, or clock_offset_<device
+    id> for a tagged device) are recorded in METRICS.
+    """
+
+    INITIAL_BACKOFF = 1.0
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, esp32, frame_timeout=5.0, sinks=(), device_id=None,
+                 on_sample=None, on_no_data=None, on_connection=None):
+        """
+        :param esp32: ESP32Manager used for reading frames
+        :param frame_timeout: Maximum wait for one frame in seconds
+        :param sinks: Storage objects with append(timestamp, values) and flush(),
+                      fed from the loop thread before on_sample is called
+        :param device_id: When set, column names are tagged as "<device_id>:GPIO4"
+        :param on_sample: Called as on_sample(timestamp, values)
+        :param on_no_data: Called when a frame did not arrive in time
+        :param on_connection: Called as on_connection(connected) on every change
+        """
+        self.esp32 = esp32
+        self.on_sample = on_sample
+        self.on_no_data = on_no_data
+        self.on_connection = on_connection
+        self.sinks = list(sinks)
+        self.device_id = device_id
+        self.frame_timeout = frame_timeout
+        self.interval_seconds = 0
+        self.scheduler = None
+        self.clock = DeviceClock()
+        self._offset_gauge = 'clock_offset' if device_id is None else 'clock_offset_' + re.sub(r'\W', '_', device_id)
+        self.streaming = False
+        self.batch = 10
+        self._active = threading.Event()
+        self._shutdown = threading.Event()
+        # Set whenever the loop should stop waiting (stop or shutdown)
+        self._wakeup = threading.Event()
+        self._backoff = self.INITIAL_BACKOFF
+        self._was_connected = False
+
+    def start_acquisition(self, interval_seconds, streaming=False, batch=10):
+        """Begin reading a frame every interval_seconds
+
+        :param streaming: Let the board push samples at this interval instead
+                          of waiting for one frame per tick
+        :param batch: Samples per frame in streaming mode
+        """
+        self.interval_seconds = interval_seconds
+        self.scheduler = SamplingScheduler(interval_seconds)
+        self.streaming = streaming
+        self.batch = batch
+        self._wakeup.set()
+        self._active.set()
+
+    def stop_acquisition(self):
+        """Pause reading; the thread stays alive for a later start"""
+        self._active.clear()
+        self._wakeup.set()
+
+    def is_active(self):
+        """Check if acquisition is running"""
+        return self._active.is_set()
+
+    def reconnect_now(self):
+        """Skip the remaining backoff and retry the connection immediately"""
+        self._backoff = self.INITIAL_BACKOFF
+        self._wakeup.set()
+
+    def shutdown(self):
+        """Make run() return; only sets events, so it is safe in signal handlers"""
+        self._shutdown.set()
+        self._active.clear()
+        self._wakeup.set()
+
+    def is_shut_down(self):
+        """Check if shutdown() was called"""
+        return self._shutdown.is_set()
+
+    def _ensure_connected(self):
+        """Connect if needed, backing off after failures; True when connected"""
+        if self.esp32.is_connected():
+            return True
+        if self._was_connected:
+            self._was_connected = False
+            self._notify(self.on_connection, False)
+
+        if self.esp32.connect(stop_event=self._shutdown):
+            # The board may have rebooted, so its millis() starts over
+            self.clock.reset()
+            self._backoff = self.INITIAL_BACKOFF
+            self._was_connected = True
+            self._notify(self.on_connection, True)
+            return True
+
+        if self._shutdown.is_set():
+            return False
+        print(f"🔁 Retrying ESP32 connection in {self._backoff:.0f} s")
+        self._wakeup.clear()
+        if not self._shutdown.is_set():
+            self._wakeup.wait(self._backoff)
+        self._backoff = min(self._backoff * 2, self.MAX_BACKOFF)
+        return False
+
+    def run(self):
+        """Keep connected, read, publish, wait for the next tick; returns after shutdown()"""
+        while not self._shutdown.is_set():
+            if not self._ensure_connected():
+                continue
+            if not self._active.is_set():
+                if self.esp32.streaming:
+                    self.esp32.stop_stream()
+                self._active.wait(0.2)
+                continue
+            self._wakeup.clear()
+
+            if self.streaming:
+                self._read_stream()
+            else:
+                self._read_polled()
+
+            if not self._active.is_set():
+                # Acquisition paused or shutting down: persist what we have
+                if self.esp32.streaming:
+                    self.esp32.stop_stream()
+                self.flush_sinks()
+
+    def _read_polled(self):
+        """Wait for the next tick, then read and publish one frame"""
+        if self.esp32.streaming:
+            self.esp32.stop_stream()
+        # Stop/shutdown interrupts the wait
+        skipped = self.scheduler.skipped
+        if not self.scheduler.wait(self._wakeup):
+            return
+        METRICS.observe('tick_lateness', self.scheduler.lateness)
+        if self.scheduler.skipped > skipped:
+            METRICS.count('ticks_skipped', self.scheduler.skipped - skipped)
+        sample = self.esp32.read_sample(
+            frame_timeout=self.frame_timeout,
+            stop_event=self._wakeup
+        )
+        if sample is not None:
+            receipt, device_time, sensor_data = sample
+            self._publish(self.clock.timestamp(receipt, device_time), sensor_data)
+            self._record_offset()
+        elif self.esp32.is_connected() and self._active.is_set() and not self._wakeup.is_set():
+            self._notify(self.on_no_data)
+
+    def _read_stream(self):
+        """Publish every sample the board pushed since the last call"""
+        if not self.esp32.streaming:
+            self.esp32.start_stream(self.interval_seconds * 1000, self.batch)
+        samples = self.esp32.read_samples(
+            frame_timeout=self.frame_timeout,
+            stop_event=self._wakeup
+        )
+        if not samples:
+            if self.esp32.is_connected() and self._active.is_set() and not self._wakeup.is_set():
+                self._notify(self.on_no_data)
+            return
+
+        # Batched samples share a receipt time; the device clock spaces them
+        timestamps = self.clock.timestamps(samples)
+        for timestamp, (_, _, values) in zip(timestamps, samples):
+            self._publish(timestamp, values)
+        self._record_offset()
+
+    def _record_offset(self):
+        """Put the current host minus device clock offset into METRICS"""
+        if self.clock.offset is not None:
+            METRICS.set(self._offset_gauge, self.clock.offset)
+
+    @staticmethod
+    def _notify(callback, *args):
+        """Call an optional callback"""
+        if callback is not None:
+            callback(*args)
+
+    def _publish(self, timestamp, sensor_data):
+        """Hand one sample to the sinks and the callback"""
+        if self.device_id is not None:
+            sensor_data = {f"{self.device_id}:{name}": value for name, value in sensor_data.items()}
+        with METRICS.timed('store'):
+            for sink in self.sinks:
+                sink.append(timestamp, sensor_data)
+        self._notify(self.on_sample, timestamp, sensor_data)
+
+    def flush_sinks(self):
+        """Flush every storage sink"""
+        for sink in self.sinks:
+            try:
+                sink.flush()
+            except Exception as e:
+                print(f"❌ Error flushing storage: {e}")
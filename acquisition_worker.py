@@ -0,0 +1,70 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from acquisition_loop import AcquisitionLoop
+
+
+class AcquisitionWorker(QThread):
+    """Background thread that polls the ESP32 and hands samples to the GUI
+
+    The thread runs an AcquisitionLoop, which owns the connection, paces the
+    reads and stamps the samples, and turns its callbacks into Qt signals.
+    """
+
+    data_received = pyqtSignal(float, dict)  # Sample time (epoch seconds), values
+    no_data = pyqtSignal()
+    connection_changed = pyqtSignal(bool)
+
+    def __init__(self, esp32, frame_timeout=5.0, sinks=(), device_id=None, parent=None):
+        """
+        :param esp32: ESP32Manager used for reading frames
+        :param frame_timeout: Maximum wait for one frame in seconds
+        :param sinks: Storage objects with append(timestamp, values) and flush(),
+                      fed from this thread before the GUI sees the sample
+        :param device_id: When set, column names are tagged as "<device_id>:GPIO4"
+        """
+        super().__init__(parent)
+        self.loop = AcquisitionLoop(
+            esp32,
+            frame_timeout=frame_timeout,
+            sinks=sinks,
+            device_id=device_id,
+            on_sample=self.data_received.emit,
+            on_no_data=self.no_data.emit,
+            on_connection=self.connection_changed.emit
+        )
+
+    @property
+    def esp32(self):
+        """ESP32Manager read by this worker"""
+        return self.loop.esp32
+
+    def start_acquisition(self, interval_seconds, streaming=False, batch=10):
+        """Begin reading; see AcquisitionLoop.start_acquisition"""
+        self.loop.start_acquisition(interval_seconds, streaming, batch)
+        if not self.isRunning():
+            self.start()
+
+    def stop_acquisition(self):
+        """Pause reading; the thread stays alive for a later start"""
+        self.loop.stop_acquisition()
+
+    def is_active(self):
+        """Check if acquisition is running"""
+        return self.loop.is_active()
+
+    def reconnect_now(self):
+        """Skip the remaining backoff and retry the connection immediately"""
+        self.loop.reconnect_now()
+
+    def shutdown(self, timeout_ms=3000):
+        """Stop the thread and wait for it to finish"""
+        self.loop.shutdown()
+        if self.isRunning():
+            self.wait(timeout_ms)
+
+    def flush_sinks(self):
+        """Flush every storage sink"""
+        self.loop.flush_sinks()
+
+    def run(self):
+        """Thread body"""
+        self.loop.run()
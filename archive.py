@@ -0,0 +1,299 @@
+"""Time-bucketed, compressed CSV archives
+
+ArchiveWriter is a storage sink that writes samples into one CSV per hour or
+per day:
+
+    archive/datas_20240521_14.csv       bucket being written, plain text
+    archive/datas_20240521_13.csv.gz    finished buckets, compressed
+
+When a sample falls into a new bucket the previous file is compressed by a
+background thread and the plain file is removed. The time range of every
+archive is in its name, so read_range() opens only the archives that
+overlap the requested range and decompresses them as a stream.
+
+gzip and xz come with Python; zstd needs the optional zstandard package.
+"""
+import csv
+import gzip
+import io
+import lzma
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from array import array
+from csv_format import MISSING, CsvSampleWriter, TimestampParser, parse_value
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PERIODS = ('hour', 'day')
+COMPRESSIONS = {'gzip': '.gz', 'xz': '.xz', 'zstd': '.zst'}
+COMPRESSED_EXTENSIONS = tuple(COMPRESSIONS.values())
+
+
+def available_compressions():
+    """Compression names usable here"""
+    return [name for name in COMPRESSIONS if name != 'zstd' or zstandard is not None]
+
+
+def is_compressed(path):
+    """True for a .gz, .xz or .zst file name"""
+    return path.endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_archive(path, mode='rb'):
+    """Binary file object that compresses or decompresses by extension
+
+    Plain files are opened as they are. Archives made of several
+    concatenated compressed members are read as one stream.
+    """
+    return _open_as(os.path.splitext(path)[1], path, mode)
+
+
+def _open_as(extension, path, mode):
+    """open_archive for the format of extension, whatever path is called"""
+    if extension == '.gz':
+        return gzip.open(path, mode)
+    if extension == '.xz':
+        return lzma.open(path, mode)
+    if extension == '.zst':
+        if zstandard is None:
+            raise RuntimeError(f"Cannot open {path}: the zstandard package is not installed")
+        raw = open(path, mode)
+        if 'r' in mode:
+            return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+    return open(path, mode)
+
+
+def bucket_start(timestamp, period):
+    """Local-time start of the hour or day containing timestamp"""
+    t = time.localtime(timestamp)
+    hour = t.tm_hour if period == 'hour' else 0
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, hour, 0, 0, 0, 0, -1))
+
+
+def bucket_end(start, period):
+    """Start of the following bucket; mktime normalises the overflowing field"""
+    t = time.localtime(start)
+    if period == 'hour':
+        return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour + 1, 0, 0, 0, 0, -1))
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+
+def _bucket_name(prefix, start, period):
+    """File name of the plain bucket starting at start"""
+    stamp = time.strftime('%Y%m%d_%H' if period == 'hour' else '%Y%m%d', time.localtime(start))
+    return f"{prefix}_{stamp}.csv"
+
+
+def list_archives(directory, prefix='datas', start=None, end=None):
+    """Bucket files overlapping [start, end], oldest first
+
+    :return: List of (bucket start, bucket end, path); a bucket that exists
+             both compressed and plain (being written) gives both files
+    """
+    pattern = re.compile(rf'^{re.escape(prefix)}_(\d{{8}})(?:_(\d{{2}}))?\.csv(\.gz|\.xz|\.zst)?$')
+    found = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = pattern.match(name)
+        if match is None:
+            continue
+        day, hour, extension = match.groups()
+        period = 'day' if hour is None else 'hour'
+        first = time.mktime((int(day[:4]), int(day[4:6]), int(day[6:]), int(hour or 0), 0, 0, 0, 0, -1))
+        last = bucket_end(first, period)
+        if (start is None or last > start) and (end is None or first <= end):
+            # Compressed before plain, so rows come out in time order
+            found.append((first, last, extension is None, os.path.join(directory, name)))
+    found.sort()
+    return [(first, last, path) for first, last, _, path in found]
+
+
+def iter_samples(path):
+    """Yield (timestamp, {name: float}) from a plain or compressed CSV, streaming
+
+    A repeated "Date;Time;..." line (archives appended to after a restart)
+    switches to the columns it names. Rows with a malformed date are skipped.
+    """
+    parser = TimestampParser()
+    with open_archive(path, 'rb') as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+        columns = None
+        for row in csv.reader(text, delimiter=';'):
+            if len(row) >= 2 and row[0] == "Date" and row[1] == "Time":
+                columns = list(enumerate(row))[2:]
+                continue
+            if columns is None or len(row) < 2:
+                continue
+            timestamp = parser.parse(row[0], row[1])
+            if timestamp is None:
+                continue
+            values = {}
+            for field, name in columns:
+                if field < len(row) and row[field] != '':
+                    value = parse_value(row[field])
+                    if value == value:
+                        values[name] = value
+            yield timestamp, values
+
+
+def read_file(path, start=None, end=None, columns=None):
+    """Samples of one CSV file (plain or compressed) with start <= timestamp <= end
+
+    :return: (array('d') timestamps, dict name -> array('d') with NaN for missing)
+    """
+    return _collect([path], start, end, columns)
+
+
+def read_range(directory, start=None, end=None, columns=None, prefix='datas'):
+    """Samples from every archive overlapping [start, end]; other files are not opened
+
+    :return: Same shape as read_file
+    """
+    return _collect([path for _, _, path in list_archives(directory, prefix, start, end)], start, end, columns)
+
+
+def _collect(paths, start, end, columns):
+    """Gather samples of several files into column arrays"""
+    timestamps = array('d')
+    result = {} if columns is None else {name: array('d') for name in columns}
+    for path in paths:
+        for timestamp, values in iter_samples(path):
+            if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                continue
+            if columns is None:
+                for name in values:
+                    if name not in result:
+                        result[name] = array('d', [MISSING]) * len(timestamps)
+            timestamps.append(timestamp)
+            for name, column in result.items():
+                column.append(values.get(name, MISSING))
+    return timestamps, result
+
+
+def compress_file(path, compression='gzip'):
+    """Compress a finished bucket next to itself and delete the plain file
+
+    If the archive already exists (the bucket was reopened after a restart)
+    the new rows are appended to it as another compressed member. The
+    result replaces the archive only once it is complete.
+
+    :return: Path of the archive
+    """
+    extension = COMPRESSIONS[compression]
+    target = path + extension
+    temporary = target + '.part'
+    if os.path.exists(target):
+        shutil.copyfile(target, temporary)
+        mode = 'ab'
+    else:
+        mode = 'wb'
+    try:
+        with open(path, 'rb') as source, _open_as(extension, temporary, mode) as sink:
+            shutil.copyfileobj(source, sink, 1 << 20)
+        os.replace(temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    os.remove(path)
+    return target
+
+
+class ArchiveWriter:
+    """Storage sink rotating samples into hourly or daily compressed CSV files
+
+    Samples are appended to the plain CSV of the current bucket through a
+    CsvSampleWriter. A sample from a later bucket closes that file and hands
+    it to a background thread for compression; samples that arrive late for
+    an already closed bucket go into the current one. Plain buckets left by
+    an earlier run are compressed on start, except the one still current.
+    """
+
+    def __init__(self, directory='archive', period='hour', compression='gzip', prefix='datas'):
+        """
+        :param directory: Folder for the bucket files, created if missing
+        :param period: 'hour' or 'day'
+        :param compression: 'gzip', 'xz' or 'zstd'
+        :param prefix: File name prefix
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}, expected one of {PERIODS}")
+        if compression not in available_compressions():
+            raise ValueError(f"Compression {compression!r} is not available here")
+        self.directory = directory
+        self.period = period
+        self.compression = compression
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._start = None  # Bucket of the open file
+        self._end = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._compress_loop, name='archive-compressor', daemon=True)
+        self._thread.start()
+
+        current = _bucket_name(prefix, bucket_start(time.time(), period), period)
+        for _, _, path in list_archives(directory, prefix):
+            if not is_compressed(path) and os.path.basename(path) != current:
+                self._queue.put(path)
+
+    def append(self, timestamp, values):
+        """Write one sample into its bucket"""
+        with self._lock:
+            if self._start is None or timestamp >= self._end:
+                self._rotate(bucket_start(timestamp, self.period))
+            self._writer.append(timestamp, values)
+
+    def _rotate(self, start):
+        """Close the open bucket for compression and open the one at start"""
+        self._close_bucket()
+        self._start = start
+        self._end = bucket_end(start, self.period)
+        path = os.path.join(self.directory, _bucket_name(self.prefix, start, self.period))
+        self._writer = CsvSampleWriter(path)
+
+    def _close_bucket(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._queue.put(self._writer.path)
+        self._writer = None
+
+    def flush(self):
+        """Push the open bucket to disk"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+
+    def close(self):
+        """Close the open bucket and wait until every bucket is compressed"""
+        with self._lock:
+            self._close_bucket()
+            self._start = None
+        self._queue.put(None)
+        self._thread.join()
+
+    def _compress_loop(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            try:
+                started = time.perf_counter()
+                before = os.path.getsize(path)
+                target = compress_file(path, self.compression)
+                print(f"🗜️ {os.path.basename(path)}: {before} -> {os.path.getsize(target)} bytes "
+                      f"in {time.perf_counter() - started:.1f} s")
+            except Exception as e:
+                print(f"❌ Error compressing {path}: {e}")
@@ -0,0 +1,365 @@
+"""Throughput benchmarks against the simulated ESP32
+
+    python benchmarks.py                        # full run, writes benchmark_report.json
+    python benchmarks.py --quick --compare old.json
+
+Measures frame parsing, the metrics overhead, SQLite inserts, serial throughput through ESP32Manager, table inserts
+through MyApp.add_samples, CSV export / load_csv_data, the
+whole path from the simulated board to the table and the GUI start: time
+to the first paint and until history and journal are loaded, each in a
+fresh interpreter. Metrics ending in "_per_s"
+or "_ratio" are higher-is-better; every other metric is a cost (lower is
+better). The serial runs push more than the host can read, so their ratio
+shows how much is dropped at the ceiling. --compare prints the change against an earlier report and flags
+anything more than 10% worse.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import esp32_manager
+from binary_protocol import BinaryFrameDecoder, encode_frame
+from csv_format import CsvSampleWriter
+from esp32_simulator import SimulatedESP32, encode_text_frame
+from export_worker import EXPORT_FORMATS, export_snapshot
+from frame_parser import FrameParser
+from metrics import Metrics
+from sample_journal import SampleJournal
+from sample_store import SampleStore
+
+PINS = (4, 5, 12, 13, 14, 25, 26, 27)
+REGRESSION = 0.10
+TABLE_BATCHES = (50, 1000)  # Samples per display refresh at 1 kHz and 20 kHz
+HIGHER_IS_BETTER = ('_per_s', '_ratio')
+
+# Run by bench_startup in a fresh interpreter: argv is the repository folder,
+# the serial port and the rows expected once loading is done
+STARTUP_SCRIPT = r"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+import main
+imported = time.perf_counter()
+app = QApplication(sys.argv[:1])
+marks = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint and 'paint' not in marks:
+            marks['paint'] = time.perf_counter()
+        return False
+
+watcher = FirstPaint()
+app.installEventFilter(watcher)
+window = main.MyApp(ports=[sys.argv[2]])
+constructed = time.perf_counter()
+deadline = started + 60
+while ('paint' not in marks or window.model.rowCount() < int(sys.argv[3])) and time.perf_counter() < deadline:
+    app.processEvents()
+    time.sleep(0.001)
+loaded = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'construct_s': constructed - imported,
+    'first_paint_s': marks.get('paint', loaded) - started,
+    'loaded_s': loaded - started,
+    'rows_loaded': window.model.rowCount(),
+}))
+window.close()
+"""
+
+
+def _samples(count, pins=PINS):
+    return [(i * 10, {pin: (i * 7 + pin) % 4096 for pin in pins}) for i in range(count)]
+
+
+def bench_parser(frames):
+    """Parse pre-encoded frames fed in 4 KB chunks"""
+    results = {}
+    for name, encode, parser in (
+        ('text', lambda s: encode_text_frame([(None, s[0][1])]), FrameParser()),
+        ('binary', lambda s: encode_frame(s), BinaryFrameDecoder()),
+    ):
+        data = b''.join(encode([sample]) for sample in _samples(frames))
+        started = time.perf_counter()
+        parsed = 0
+        for offset in range(0, len(data), 4096):
+            parsed += len(parser.feed(data[offset:offset + 4096]))
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'frames': parsed,
+            'frames_per_s': parsed / elapsed,
+            'parse_us_per_frame': elapsed / parsed * 1e6,
+            'bytes_per_frame': len(data) / frames,
+        }
+    return results
+
+
+def bench_metrics(calls):
+    """Cost of one timed stage, the instrumentation left on in production"""
+    metrics = Metrics()
+    started = time.perf_counter()
+    for _ in range(calls):
+        with metrics.timed('stage'):
+            pass
+    elapsed = time.perf_counter() - started
+    return {'timed_us_per_call': elapsed / calls * 1e6}
+
+
+def bench_store(samples):
+    """SQLite inserts through the sink interface and an indexed range query"""
+    base = time.time()
+    with tempfile.TemporaryDirectory(prefix='esp32_bench_') as workdir:
+        path = os.path.join(workdir, 'bench.db')
+        with SampleStore(path) as store:
+            started = time.perf_counter()
+            for i in range(samples):
+                store.append(base + i * 0.01, {f"GPIO{pin}": (i * 7 + pin) % 4096 for pin in PINS})
+            store.flush()
+            insert = time.perf_counter() - started
+            started = time.perf_counter()
+            timestamps, _ = store.query(base + samples * 0.005, base + samples * 0.005 + 10, ['GPIO4'])
+            query = time.perf_counter() - started
+        size = os.path.getsize(path)
+    return {
+        'insert_samples_per_s': samples / insert,
+        'range_query_s': query,
+        'range_rows': len(timestamps),
+        'bytes_per_sample': size / samples,
+    }
+
+
+def bench_serial(duration, rate):
+    """Frames per second through ESP32Manager from the simulator"""
+    results = {}
+    for protocol in ('text', 'auto'):
+        for corruption in (0.0, 0.01):
+            with SimulatedESP32(rate=rate, pins=PINS, corruption=corruption, seed=1) as simulator:
+                esp32 = esp32_manager.ESP32Manager(port=simulator.port, autoconnect=False, protocol=protocol)
+                if not esp32.connect():
+                    continue
+                sent_before = simulator.samples_sent
+                received = 0
+                started = time.perf_counter()
+                while time.perf_counter() - started < duration:
+                    received += len(esp32.read_samples(frame_timeout=1.0))
+                elapsed = time.perf_counter() - started
+                sent = simulator.samples_sent - sent_before
+                key = f"{esp32.wire_protocol}{'_corrupt' if corruption else ''}"
+                results[key] = {
+                    'frames_per_s': received / elapsed,
+                    'received_ratio': received / sent if sent else 0.0,
+                }
+                esp32.disconnect()
+    return results
+
+
+def bench_startup(history_rows, journal_rows, runs):
+    """Start MyApp over a history file and a leftover journal; median of runs"""
+    with tempfile.TemporaryDirectory(prefix='esp32_start_') as workdir:
+        base = time.time() - 86400
+        writer = CsvSampleWriter(os.path.join(workdir, 'data_file.csv'))
+        for timestamp, values in _samples(history_rows):
+            writer.append(base + timestamp / 1000, {f"GPIO{pin}": value for pin, value in values.items()})
+        writer.close()
+        leftover = os.path.join(workdir, 'leftover.journal')
+        journal = SampleJournal(leftover)
+        for timestamp, values in _samples(journal_rows):
+            journal.append(base + 3600 + timestamp / 1000, {f"GPIO{pin}": value for pin, value in values.items()})
+        journal.close()
+
+        repository = os.path.dirname(os.path.abspath(__file__))
+        measured = []
+        with SimulatedESP32(rate=0, pins=PINS, seed=1) as simulator:
+            for _ in range(runs):
+                # Each start moves the journal aside and keeps it, so every run
+                # starts from one new copy
+                session = SampleJournal(os.path.join(workdir, 'session.journal'))
+                session.discard_previous()
+                shutil.copyfile(leftover, session.path)
+                process = subprocess.run(
+                    [sys.executable, '-c', STARTUP_SCRIPT, repository, simulator.port, str(history_rows + journal_rows)],
+                    cwd=workdir, capture_output=True, text=True, timeout=120
+                )
+                lines = [line for line in process.stdout.splitlines() if line.startswith('{')]
+                if process.returncode or not lines:
+                    return {'error': (process.stderr or process.stdout).strip()[-500:]}
+                measured.append(json.loads(lines[-1]))
+        return {key: statistics.median(run[key] for run in measured) for key in measured[0]}
+
+
+def _make_app(port):
+    """MyApp reading the simulator, in a scratch working directory"""
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    import main
+    window = main.MyApp(ports=[port])
+    return app, window
+
+
+def bench_table(window, sizes):
+    """MyApp.add_samples cost per row in display-sized batches, then save, export and load of the same data"""
+    results = {}
+    for size in sizes:
+        base = time.time()
+        samples = [(base + i, {f"GPIO{pin}": (i * 7 + pin) % 4096 for pin in PINS}) for i in range(size)]
+        inserts = {}
+        for batch in TABLE_BATCHES:
+            window.clear_clicked()
+            started = time.perf_counter()
+            for first in range(0, size, batch):
+                window.add_samples(samples[first:first + batch])
+            inserts[f"insert_us_per_row_batch_{batch}"] = (time.perf_counter() - started) / size * 1e6
+
+        path = os.path.abspath(f"bench_{size}.csv")
+        started = time.perf_counter()
+        snapshot = window.model.snapshot()
+        export_snapshot(snapshot, path)
+        save = time.perf_counter() - started
+        exports = {}
+        for _, extension in EXPORT_FORMATS:
+            started = time.perf_counter()
+            export_snapshot(snapshot, f"export{extension}")
+            exports[f"export{extension.replace('.', '_')}_s"] = time.perf_counter() - started
+            os.remove(f"export{extension}")
+
+        window.clear_clicked()
+        started = time.perf_counter()
+        window.load_csv_data(path)
+        first_paint = time.perf_counter() - started
+        window.model._history.wait_indexed()
+        window.model._sync_history()
+        window.model.row_texts(window.model.rowCount() - 1)
+        load = time.perf_counter() - started
+        results[str(size)] = {
+            **inserts,
+            'save_s': save,
+            **exports,
+            'load_first_rows_s': first_paint,
+            'load_indexed_s': load,
+            'rows_loaded': window.model.rowCount(),
+        }
+        window.model.detach_history()
+        os.remove(path)
+    return results
+
+
+def bench_end_to_end(app, window, simulator, duration):
+    """Rows per second from the simulated board into the table, streaming"""
+    deadline = time.monotonic() + 10
+    while not window.devices.is_connected() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    if not window.devices.is_connected():
+        return {'error': 'simulator did not connect'}
+    window.clear_clicked()
+    rows_before = window.model.rowCount()
+    sent_before = simulator.samples_sent
+    window.devices.start_acquisition(0.001, streaming=True, batch=50)
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        app.processEvents()
+        time.sleep(0.001)
+    window.devices.stop_acquisition()
+    elapsed = time.perf_counter() - started
+    rows = window.model.rowCount() - rows_before
+    sent = simulator.samples_sent - sent_before
+    return {
+        'rows_per_s': rows / elapsed,
+        'received_ratio': rows / sent if sent else 0.0,
+    }
+
+
+def compare(old, new, prefix=''):
+    """Print every metric next to its old value; return the number of regressions"""
+    regressions = 0
+    for key, value in new.items():
+        name = f"{prefix}{key}"
+        before = old.get(key) if isinstance(old, dict) else None
+        if isinstance(value, dict):
+            regressions += compare(before or {}, value, name + '.')
+            continue
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+            continue
+        change = (value - before) / abs(before)
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = '❌' if worse > REGRESSION else '✅'
+        regressions += worse > REGRESSION
+        print(f"{flag} {name}: {before:.4g} -> {value:.4g} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 acquisition benchmarks")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes and shorter runs")
+    parser.add_argument('--report', default='benchmark_report.json', help="JSON report to write")
+    parser.add_argument('--compare', default=None, help="Earlier report to compare with")
+    args = parser.parse_args()
+
+    sizes = (1000, 10000) if args.quick else (1000, 10000, 100000)
+    duration = 1.0 if args.quick else 3.0
+    report_path = os.path.abspath(args.report)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    # The simulator needs no boot time
+    esp32_manager.BOOT_TIME = 0.0
+
+    results = {}
+    print("⏱️ Parser")
+    results['parser'] = bench_parser(20000 if args.quick else 100000)
+    results['metrics'] = bench_metrics(100000)
+    print("⏱️ SQLite store")
+    results['store'] = bench_store(20000 if args.quick else 200000)
+    print("⏱️ Serial throughput")
+    results['serial'] = bench_serial(duration, rate=50000)
+    print("⏱️ Startup")
+    results['startup'] = bench_startup(10000 if args.quick else 100000, 10000 if args.quick else 100000,
+                                       runs=3 if args.quick else 5)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='esp32_bench_') as workdir:
+        os.chdir(workdir)
+        try:
+            with SimulatedESP32(rate=0, pins=PINS, seed=1) as simulator:
+                app, window = _make_app(simulator.port)
+                print("⏱️ Table insert, save and load")
+                results['table'] = bench_table(window, sizes)
+                print("⏱️ End to end")
+                results['end_to_end'] = bench_end_to_end(app, window, simulator, duration)
+                window.close()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'results': results,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report written to {report_path}")
+
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as f:
+            old = json.load(f)
+        regressions = compare(old.get('results', {}), results)
+        print(f"{regressions} regression(s) over {REGRESSION:.0%}")
+        return 1 if regressions else 0
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
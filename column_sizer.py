@@ -0,0 +1,78 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontMetrics
+from PyQt6.QtWidgets import QHeaderView
+
+
+class ColumnWidthTracker:
+    """Grows table columns to fit their widest value without rescanning rows
+
+    Remembers the widest text seen per column and only touches the header
+    when a new maximum appears, so the cost per inserted row does not depend
+    on the table size. After a reset only a bounded window of rows is sampled.
+    """
+
+    def __init__(self, view, padding=24, sample_rows=200):
+        """
+        :param view: QTableView whose columns are sized
+        :param padding: Extra pixels added to the measured text width
+        :param sample_rows: Rows measured from each end after a model reset
+        """
+        self.view = view
+        self.padding = padding
+        self.sample_rows = sample_rows
+        self._widths = []  # Pixel width per column
+        self._lengths = []  # Longest text length per column, cheap pre-check
+
+        header = view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+
+        model = view.model()
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.columnsInserted.connect(self.reset)
+        model.modelReset.connect(self.reset)
+        self.reset()
+
+    def reset(self):
+        """Recompute widths from the headers and a bounded sample of rows"""
+        model = self.view.model()
+        columns = model.columnCount()
+        self._widths = [0] * columns
+        self._lengths = [0] * columns
+
+        header_metrics = QFontMetrics(self.view.horizontalHeader().font())
+        for column in range(columns):
+            text = str(model.headerData(column, Qt.Orientation.Horizontal) or "")
+            self._widths[column] = header_metrics.horizontalAdvance(text)
+
+        rows = model.rowCount()
+        if rows <= 2 * self.sample_rows:
+            sample = range(rows)
+        else:
+            sample = list(range(self.sample_rows)) + list(range(rows - self.sample_rows, rows))
+        for row in sample:
+            self.observe_row(model.row_texts(row), apply=False)
+
+        for column, width in enumerate(self._widths):
+            self.view.setColumnWidth(column, width + self.padding)
+
+    def observe_row(self, texts, apply=True):
+        """Account for one row of cell texts; widen columns that grew"""
+        metrics = None
+        for column, text in enumerate(texts):
+            if column >= len(self._widths) or len(text) < self._lengths[column]:
+                continue
+            self._lengths[column] = len(text)
+            if metrics is None:
+                metrics = QFontMetrics(self.view.font())
+            width = metrics.horizontalAdvance(text)
+            if width > self._widths[column]:
+                self._widths[column] = width
+                if apply:
+                    self.view.setColumnWidth(column, width + self.padding)
+
+    def _on_rows_inserted(self, parent, first, last):
+        """Measure newly inserted rows, at most sample_rows of them"""
+        model = self.view.model()
+        for row in range(max(first, last - self.sample_rows + 1), last + 1):
+            self.observe_row(model.row_texts(row))
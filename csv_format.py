@@ -0,0 +1,148 @@
+import csv
+import math
+import os
+import time
+from datetime import datetime
+
+DATE_FORMAT = "%d.%m.%Y"
+TIME_FORMAT = "%H:%M:%S"
+MISSING = math.nan  # Marks a GPIO that was absent from a sample
+
+
+def format_time(moment, timestamp):
+    """Time of day with milliseconds, e.g. '14:03:07.250'
+
+    :param moment: time.localtime(timestamp)
+    :param timestamp: Epoch seconds, for the fraction
+    """
+    return f"{time.strftime(TIME_FORMAT, moment)}.{int(timestamp % 1 * 1000):03d}"
+
+
+def format_value(value):
+    """Render a stored numeric value the way the device sent it"""
+    if value != value:  # NaN
+        return ""
+    if value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def parse_value(text):
+    """Convert a CSV cell to a float, empty/garbage becomes MISSING"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+class TimestampParser:
+    """Turns 'dd.mm.yyyy' + 'hh:mm:ss[.fff]' strings into epoch seconds
+
+    Midnight of each date is resolved once and cached, so parsing a long file
+    costs one split per row instead of a strptime call.
+    """
+
+    def __init__(self):
+        self._midnights = {}
+
+    def parse(self, date_str, time_str):
+        """Return epoch seconds or None if the strings are malformed"""
+        midnight = self._midnights.get(date_str)
+        if midnight is None:
+            try:
+                day = datetime.strptime(date_str, DATE_FORMAT)
+            except ValueError:
+                return None
+            midnight = time.mktime(day.timetuple())
+            self._midnights[date_str] = midnight
+        try:
+            h, m, s = time_str.split(':')
+            return midnight + int(h) * 3600 + int(m) * 60 + float(s)
+        except ValueError:
+            return None
+
+
+
+class CsvSampleWriter:
+    """Sink that appends samples to a ';'-delimited Date;Time;GPIO... file
+
+    An existing file is continued with its columns. When a sample brings a
+    new column the file is rewritten once with the wider header, so every
+    row always has a cell for every column. Rows are flushed to disk every
+    flush_rows samples and on flush().
+    """
+
+    def __init__(self, path, flush_rows=50):
+        """
+        :param path: Output CSV file
+        :param flush_rows: Samples per flush
+        """
+        self.path = path
+        self.flush_rows = flush_rows
+        self.columns = []
+        self._file = None
+        self._writer = None
+        self._pending = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                headers = next(csv.reader(f, delimiter=';'), [])
+            if headers[:2] == ["Date", "Time"]:
+                self.columns = headers[2:]
+                self._open('a')
+
+    def _open(self, mode):
+        """Open the file; a fresh file gets the header row"""
+        self._file = open(self.path, mode, newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, delimiter=';')
+        if mode == 'w':
+            self._writer.writerow(["Date", "Time"] + self.columns)
+
+    def _widen(self, new_columns):
+        """Rewrite the file with extra columns, padding the old rows"""
+        old_width = 2 + len(self.columns)
+        rows = []
+        if self._file is not None:
+            self._file.close()
+            with open(self.path, newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f, delimiter=';'))[1:]
+        self.columns = self.columns + sorted(new_columns)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(["Date", "Time"] + self.columns)
+            padding = [''] * len(new_columns)
+            for row in rows:
+                writer.writerow(row[:old_width] + [''] * (old_width - len(row)) + padding)
+        os.replace(temporary, self.path)
+        self._open('a')
+
+    def append(self, timestamp, values):
+        """Write one sample; values maps column name -> value"""
+        new_columns = [name for name in values if name not in self.columns]
+        if new_columns or self._file is None:
+            self._widen(new_columns)
+        moment = time.localtime(timestamp)
+        row = [time.strftime(DATE_FORMAT, moment), format_time(moment, timestamp)]
+        for name in self.columns:
+            value = values.get(name)
+            row.append('' if value is None else str(value))
+        self._writer.writerow(row)
+        self._pending += 1
+        if self._pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Push written rows to disk"""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        """Flush and close the file"""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
\ No newline at end of file
@@ -0,0 +1,150 @@
+import csv
+import mmap
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from csv_format import TimestampParser
+
+
+class PagedCsvFile:
+    """Read-only view of a large ';'-delimited CSV file, loaded page by page
+
+    A background thread scans the memory-mapped file once and records the byte
+    offset where each page of rows starts. Rows are parsed only when asked for,
+    a page at a time, and a small LRU cache keeps recently viewed pages. Memory
+    use is 8 bytes per page plus the cache, whatever the file size.
+    """
+
+    def __init__(self, filename, page_size=1024, cached_pages=64):
+        """
+        :param filename: CSV file with a header row
+        :param page_size: Rows parsed together
+        :param cached_pages: Parsed pages kept in memory
+        """
+        self.filename = filename
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self._file = open(filename, 'rb')
+        self._map = None
+        self._page_offsets = array('q')  # Start offset of each page
+        self._rows = 0
+        # One C-level regex match skips a whole page of lines
+        self._page_pattern = re.compile(rb'(?:[^\n]*\n){%d}' % page_size)
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan_thread = None
+        self._scan_done = threading.Event()
+        self._stop = threading.Event()
+        self._timestamp_parser = TimestampParser()
+
+        size = self._file.seek(0, 2)
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.headers = self._read_headers()
+
+    def _read_headers(self):
+        """Parse the header line and remember where data starts"""
+        if self._map is None:
+            self._data_start = 0
+            return []
+        end = self._map.find(b'\n')
+        if end < 0:
+            end = len(self._map)
+        self._data_start = end + 1
+        line = self._map[:end].decode('utf-8-sig', errors='replace').rstrip('\r')
+        return next(csv.reader([line], delimiter=';'), [])
+
+    def start_indexing(self):
+        """Build the row index in a background thread"""
+        if self._scan_thread is not None:
+            return
+        self._scan_thread = threading.Thread(target=self._scan, name='csv-index', daemon=True)
+        self._scan_thread.start()
+
+    def _scan(self):
+        """Record where every page starts and count the rows"""
+        try:
+            if self._map is None:
+                return
+            data = self._map
+            position = self._data_start
+            while not self._stop.is_set():
+                match = self._page_pattern.match(data, position)
+                if match is None:
+                    break
+                with self._lock:
+                    self._page_offsets.append(position)
+                    self._rows += self.page_size
+                position = match.end()
+
+            # Last, partial page
+            tail = data[position:]
+            count = tail.count(b'\n')
+            if tail and not tail.endswith(b'\n'):
+                count += 1
+            if count and not self._stop.is_set():
+                with self._lock:
+                    self._page_offsets.append(position)
+                    self._rows += count
+        finally:
+            self._scan_done.set()
+
+    def is_indexed(self):
+        """Check if the background scan has finished"""
+        return self._scan_done.is_set()
+
+    def wait_indexed(self, timeout=None):
+        """Block until the scan finishes"""
+        return self._scan_done.wait(timeout)
+
+    def row_count(self):
+        """Rows indexed so far"""
+        with self._lock:
+            return self._rows
+
+    def row(self, index):
+        """Fields of one data row as strings"""
+        page_number, position = divmod(index, self.page_size)
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self._load_page(page_number)
+        else:
+            self._pages.move_to_end(page_number)
+        return page[position]
+
+    def timestamp(self, index, date_index, time_index):
+        """Epoch seconds of a row given the Date and Time field positions"""
+        fields = self.row(index)
+        if len(fields) <= max(date_index, time_index):
+            return None
+        return self._timestamp_parser.parse(fields[date_index], fields[time_index])
+
+    def _load_page(self, page_number):
+        """Parse one page of rows straight from the mapped file"""
+        with self._lock:
+            if page_number >= len(self._page_offsets):
+                raise IndexError(page_number)
+            start = self._page_offsets[page_number]
+            if page_number + 1 < len(self._page_offsets):
+                end = self._page_offsets[page_number + 1]
+            else:
+                end = len(self._map)
+        text = self._map[start:end].decode('utf-8', errors='replace')
+        lines = text.split('\n')[:self.page_size]
+        rows = list(csv.reader([line.rstrip('\r') for line in lines], delimiter=';'))
+        self._pages[page_number] = rows
+        while len(self._pages) > self.cached_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def close(self):
+        """Stop scanning and release the file"""
+        self._stop.set()
+        if self._scan_thread is not None:
+            self._scan_thread.join()
+        self._pages.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
@@ -0,0 +1,304 @@
+import csv
+import time
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from csv_format import DATE_FORMAT, MISSING, TimestampParser, format_time, format_value, parse_value
+from ring_buffer import SampleRing
+
+
+class TableSnapshot:
+    """Rows of a SensorTableModel frozen for reading from another thread
+
+    Taking one is cheap: the history file is only referenced up to the rows
+    indexed so far, and the live ring copies its in-memory arrays.
+    """
+
+    def __init__(self, value_names, history_path, history_rows, live):
+        """
+        :param value_names: Value columns in display order
+        :param history_path: CSV shown ahead of the live rows, or None
+        :param history_rows: Rows of that file in the table
+        :param live: ring_buffer.RingSnapshot
+        """
+        self.value_names = value_names
+        self.history_path = history_path
+        self.history_rows = history_rows
+        self.live = live
+
+    def __len__(self):
+        return self.history_rows + len(self.live)
+
+    def headers(self):
+        """Column names, Date and Time first"""
+        return SensorTableModel.BASE_HEADERS + self.value_names
+
+    def iter_rows(self):
+        """Yield (timestamp or None, {name: float}) for every row in table order
+
+        The timestamp is None for a history row with a malformed date.
+        """
+        if self.history_rows:
+            yield from self._history_rows()
+        yield from self.live.iter_rows()
+
+    def _history_rows(self):
+        """Rows of the history CSV, one per line as PagedCsvFile counts them"""
+        parser = TimestampParser()
+        with open(self.history_path, encoding='utf-8-sig', errors='replace', newline='') as f:
+            reader = csv.reader((line.rstrip('\r\n') for line in f), delimiter=';')
+            headers = next(reader, [])
+            fields = {name: i for i, name in enumerate(headers)}
+            date_field, time_field = fields.get("Date"), fields.get("Time")
+            columns = [(name, fields[name]) for name in self.value_names if name in fields]
+            for _, row in zip(range(self.history_rows), reader):
+                timestamp = None
+                if date_field is not None and time_field is not None and len(row) > max(date_field, time_field):
+                    timestamp = parser.parse(row[date_field], row[time_field])
+                values = {}
+                for name, field in columns:
+                    if field < len(row):
+                        value = parse_value(row[field])
+                        if value == value:
+                            values[name] = value
+                yield timestamp, values
+
+
+class SensorTableModel(QAbstractTableModel):
+    """Column-oriented storage for sensor samples
+
+    Each row is one sample: an epoch timestamp plus one float per value
+    column. Date and Time strings are only produced when the view asks for a
+    visible cell.
+
+    Rows loaded from a history file come first and are served page by page
+    from a PagedCsvFile; live samples follow in a SampleRing, which keeps the
+    newest live_capacity rows in memory and spills older ones to disk.
+    """
+
+    BASE_HEADERS = ["Date", "Time"]
+
+    def __init__(self, parent=None, live_capacity=100000):
+        """
+        :param live_capacity: Live rows kept in memory before spilling to disk
+        """
+        super().__init__(parent)
+        self._live = SampleRing(capacity=live_capacity)
+        self._value_names = []  # Value column names in display order
+
+        self._history = None  # PagedCsvFile or None
+        self._history_rows = 0
+        self._history_fields = {}  # Column name -> field index in history rows
+        self._history_timer = QTimer(self)
+        self._history_timer.setInterval(100)
+        self._history_timer.timeout.connect(self._sync_history)
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        """Number of samples"""
+        if parent.isValid():
+            return 0
+        return self._history_rows + len(self._live)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Date, Time and one column per value"""
+        if parent.isValid():
+            return 0
+        return len(self.BASE_HEADERS) + len(self._value_names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """Format a cell on demand"""
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return self.cell_text(index.row(), index.column())
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        """Column names for the horizontal header"""
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            headers = self.headers()
+            if 0 <= section < len(headers):
+                return headers[section]
+            return None
+        return str(section + 1)
+
+    # --- Data access ---
+
+    def headers(self):
+        """Current column names"""
+        return self.BASE_HEADERS + self._value_names
+
+    def value_names(self):
+        """Names of the value columns in display order"""
+        return list(self._value_names)
+
+    def cell_text(self, row, column):
+        """Text of a single cell"""
+        if row < self._history_rows:
+            name = self.BASE_HEADERS[column] if column < 2 else self._value_names[column - 2]
+            field = self._history_fields.get(name)
+            fields = self._history.row(row)
+            return fields[field] if field is not None and field < len(fields) else ""
+        row -= self._history_rows
+        if column == 0:
+            return time.strftime(DATE_FORMAT, time.localtime(self._live.timestamp(row)))
+        if column == 1:
+            timestamp = self._live.timestamp(row)
+            return format_time(time.localtime(timestamp), timestamp)
+        return format_value(self._live.value(self._value_names[column - 2], row))
+
+    def sample(self, row):
+        """Timestamp and {name: float} values of a row
+
+        The timestamp is None for a history row with a malformed date.
+        """
+        if row < self._history_rows:
+            fields = self._history.row(row)
+            timestamp = None
+            date_field = self._history_fields.get("Date")
+            time_field = self._history_fields.get("Time")
+            if date_field is not None and time_field is not None:
+                timestamp = self._history.timestamp(row, date_field, time_field)
+            values = {}
+            for name in self._value_names:
+                field = self._history_fields.get(name)
+                if field is not None and field < len(fields):
+                    value = parse_value(fields[field])
+                    if value == value:
+                        values[name] = value
+            return timestamp, values
+        row -= self._history_rows
+        values = {}
+        for name in self._value_names:
+            value = self._live.value(name, row)
+            if value == value:
+                values[name] = value
+        return self._live.timestamp(row), values
+
+    def history_file(self):
+        """Path of the attached history CSV, or None"""
+        return None if self._history is None else self._history.filename
+
+    def live_columns(self):
+        """Live samples in bulk, see SampleRing.read_columns"""
+        return self._live.read_columns()
+
+    def snapshot(self):
+        """TableSnapshot of the current rows, for exporting in the background"""
+        return TableSnapshot(
+            list(self._value_names),
+            self.history_file() if self._history_rows else None,
+            self._history_rows,
+            self._live.snapshot()
+        )
+
+    def row_texts(self, row):
+        """All cells of a row as strings, in header order"""
+        return [self.cell_text(row, column) for column in range(self.columnCount())]
+
+    # --- Mutation ---
+
+    def set_value_columns(self, names):
+        """Make sure every name has a column; columns stay sorted by name"""
+        for name in sorted(names):
+            if name in self._value_names:
+                continue
+            position = 0
+            while position < len(self._value_names) and self._value_names[position] < name:
+                position += 1
+            column = len(self.BASE_HEADERS) + position
+            self.beginInsertColumns(QModelIndex(), column, column)
+            self._value_names.insert(position, name)
+            self._live.add_column(name)
+            self.endInsertColumns()
+
+    def append_samples(self, samples):
+        """Append a batch of samples with a single row insertion
+
+        :param samples: Sequence of (timestamp, {column name: number or numeric string})
+        """
+        if not samples:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(samples) - 1)
+        append = self._live.append
+        for timestamp, values in samples:
+            append(timestamp, values)
+        self.endInsertRows()
+
+    def append_columns(self, timestamps, columns):
+        """Append many samples at once
+
+        :param timestamps: Sequence of epoch seconds
+        :param columns: Dict column name -> sequence of values (None = missing)
+        """
+        if not timestamps:
+            return
+        self.set_value_columns(columns.keys())
+        first = self.rowCount()
+        count = len(timestamps)
+        names = list(columns)
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        for i, timestamp in enumerate(timestamps):
+            self._live.append(timestamp, {
+                name: MISSING if columns[name][i] is None else parse_value(columns[name][i])
+                for name in names
+            })
+        self.endInsertRows()
+
+    def attach_history(self, history):
+        """Show rows of a PagedCsvFile ahead of the live samples
+
+        Rows appear as the file's background scan indexes them.
+        """
+        self.detach_history()
+        self._history = history
+        self._history_fields = {name: i for i, name in enumerate(history.headers)}
+        self.set_value_columns([name for name in history.headers if name not in self.BASE_HEADERS])
+        self._sync_history()
+        if not history.is_indexed():
+            self._history_timer.start()
+
+    def detach_history(self):
+        """Drop the history rows and close the file"""
+        self._history_timer.stop()
+        if self._history is None:
+            return
+        if self._history_rows:
+            self.beginRemoveRows(QModelIndex(), 0, self._history_rows - 1)
+            self._history_rows = 0
+            self.endRemoveRows()
+        self._history.close()
+        self._history = None
+        self._history_fields = {}
+
+    def _sync_history(self):
+        """Expose rows indexed since the last check"""
+        if self._history is None:
+            return
+        done = self._history.is_indexed()
+        count = self._history.row_count()
+        if count > self._history_rows:
+            self.beginInsertRows(QModelIndex(), self._history_rows, count - 1)
+            self._history_rows = count
+            self.endInsertRows()
+        if done:
+            self._history_timer.stop()
+
+    def clear(self):
+        """Remove all rows and value columns"""
+        self.beginResetModel()
+        self._history_timer.stop()
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+        self._history_rows = 0
+        self._history_fields = {}
+        self._live.clear()
+        self._value_names = []
+        self.endResetModel()
+
+    def close(self):
+        """Release the history file and the live spill file"""
+        self.detach_history()
+        self._live.close()
@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from PyQt6.QtCore import QObject, pyqtSignal
+from esp32_manager import ESP32Manager
+from acquisition_worker import AcquisitionWorker
+from display_buffer import DisplayBuffer
+
+
+class SampleMerger:
+    """Merges samples from several devices into one time-ordered stream
+
+    Readers call append() from their own threads. A dispatcher thread holds
+    each sample for reorder_window seconds, so a slightly late sample from
+    another port can still be put in front of it, then hands samples to the
+    sinks and to on_sample in timestamp order. With a zero window samples
+    pass straight through.
+    """
+
+    def __init__(self, sinks=(), on_sample=None, reorder_window=0.2):
+        """
+        :param sinks: Objects with append(timestamp, values) and flush()
+        :param on_sample: Called as on_sample(timestamp, values) after the sinks
+        :param reorder_window: Seconds a sample waits for earlier ones
+        """
+        self.sinks = list(sinks)
+        self.on_sample = on_sample
+        self.reorder_window = reorder_window
+        self._heap = []
+        self._sequence = itertools.count()  # Tie-breaker for equal timestamps
+        self._condition = threading.Condition()
+        self._delivery_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self._thread is not None or self.reorder_window <= 0:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='sample-merger', daemon=True)
+        self._thread.start()
+
+    def append(self, timestamp, values):
+        """Queue one sample; called from reader threads"""
+        if self.reorder_window <= 0:
+            self._deliver([(timestamp, 0, values)])
+            return
+        with self._condition:
+            heapq.heappush(self._heap, (timestamp, next(self._sequence), values))
+            self._condition.notify()
+
+    def flush(self):
+        """Release every queued sample now and flush the sinks"""
+        with self._condition:
+            ready = [heapq.heappop(self._heap) for _ in range(len(self._heap))]
+        self._deliver(ready)
+        with self._delivery_lock:
+            for sink in self.sinks:
+                sink.flush()
+
+    def stop(self):
+        """Stop the dispatcher after releasing everything queued"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        """Release samples once they are older than the reorder window"""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._heap:
+                        wait = self._heap[0][0] + self.reorder_window - time.time()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                horizon = time.time() - self.reorder_window
+                ready = []
+                while self._heap and self._heap[0][0] <= horizon:
+                    ready.append(heapq.heappop(self._heap))
+            self._deliver(ready)
+
+    def _deliver(self, ready):
+        """Hand released samples to the sinks and the callback"""
+        if not ready:
+            return
+        with self._delivery_lock:
+            for timestamp, _, values in ready:
+                for sink in self.sinks:
+                    try:
+                        sink.append(timestamp, values)
+                    except Exception as e:
+                        print(f"❌ Error storing sample: {e}")
+                if self.on_sample is not None:
+                    self.on_sample(timestamp, values)
+
+
+def device_id_for(port):
+    """Short device id derived from a port name, e.g. '/dev/ttyUSB0' -> 'ttyUSB0'"""
+    if port is None:
+        return 'auto'
+    return os.path.basename(port.rstrip('/\\')) or port
+
+
+class DevicePool(QObject):
+    """Reads several ESP32 boards at once, one reader thread per port
+
+    With more than one port every column is tagged with its device id
+    ("COM5:GPIO4"); a single port keeps the plain "GPIO4" names. Samples from
+    all ports are merged into one time-ordered stream before they reach
+    storage and the GUI. The GUI does not get a signal per sample; it drains
+    the display buffer at its own refresh rate.
+    """
+
+    no_data = pyqtSignal(str)  # Device id
+    connection_changed = pyqtSignal(str, bool)  # Device id, connected
+
+    def __init__(self, ports, baud_rate=115200, sinks=(), display_capacity=50000, parent=None):
+        """
+        :param ports: Serial port names; [None] searches all ports for one board
+        :param baud_rate: Baud rate used for every port
+        :param sinks: Storage objects fed with the merged stream
+        :param display_capacity: Samples waiting for the GUI before the oldest
+                                 is dropped from the display
+
+        Boards connect in the background, so this returns immediately.
+        """
+        super().__init__(parent)
+        tag = len(ports) > 1
+        self.display = DisplayBuffer(display_capacity)
+        self.merger = SampleMerger(
+            sinks=sinks,
+            on_sample=self.display.put,
+            reorder_window=0.2 if tag else 0
+        )
+        self.devices = {}  # Device id -> ESP32Manager
+        self.workers = {}  # Device id -> AcquisitionWorker
+        for port in ports:
+            device_id = device_id_for(port)
+            esp32 = ESP32Manager(port=port, baud_rate=baud_rate, autoconnect=False)
+            worker = AcquisitionWorker(
+                esp32,
+                sinks=[self.merger],
+                device_id=device_id if tag else None
+            )
+            worker.no_data.connect(lambda device_id=device_id: self.no_data.emit(device_id))
+            worker.connection_changed.connect(
+                lambda connected, device_id=device_id: self.connection_changed.emit(device_id, connected)
+            )
+            self.devices[device_id] = esp32
+            self.workers[device_id] = worker
+        self.merger.start()
+        for worker in self.workers.values():
+            worker.start()
+
+    def is_connected(self):
+        """True if at least one board is connected"""
+        return any(esp32.is_connected() for esp32 in self.devices.values())
+
+    def reconnect_now(self):
+        """Make every offline board retry without waiting for its backoff"""
+        for device_id, worker in self.workers.items():
+            if not self.devices[device_id].is_connected():
+                worker.reconnect_now()
+
+    def start_acquisition(self, interval_seconds, streaming=False, batch=10):
+        """Start every reader; see AcquisitionWorker.start_acquisition
+
+        Boards not connected yet are included: their loop starts reading
+        once the background connection succeeds.
+        """
+        for worker in self.workers.values():
+            worker.start_acquisition(interval_seconds, streaming, batch)
+
+    def stop_acquisition(self):
+        """Pause every reader"""
+        for worker in self.workers.values():
+            worker.stop_acquisition()
+
+    def shutdown(self):
+        """Stop all readers, drain the merger and close the ports"""
+        for worker in self.workers.values():
+            worker.shutdown()
+        self.merger.stop()
+        for esp32 in self.devices.values():
+            esp32.disconnect()
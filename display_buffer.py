@@ -0,0 +1,52 @@
+import threading
+from collections import deque
+from metrics import METRICS
+
+
+class DisplayBuffer:
+    """Samples on their way from the acquisition threads to the GUI
+
+    Reader threads put() every sample after the storage sinks have it; the
+    GUI takes whatever arrived with drain() a fixed number of times per
+    second and applies it as one batch. When the GUI falls behind and
+    capacity samples are waiting, the oldest waiting sample is dropped; this
+    only thins out the display, storage has already received it. Drops are
+    counted in METRICS as display_dropped.
+    """
+
+    def __init__(self, capacity=50000):
+        """
+        :param capacity: Samples kept waiting before the oldest is dropped
+        """
+        self.capacity = capacity
+        self.dropped = 0
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def put(self, timestamp, values):
+        """Queue one sample for the display; safe from any thread"""
+        with self._lock:
+            if len(self._samples) >= self.capacity:
+                self._samples.popleft()
+                self.dropped += 1
+                METRICS.count('display_dropped')
+            self._samples.append((timestamp, values))
+
+    def drain(self):
+        """Take every waiting sample, oldest first
+
+        :return: List of (timestamp, values)
+        """
+        with self._lock:
+            samples, self._samples = self._samples, deque()
+        METRICS.set('display_backlog', len(samples))
+        return list(samples)
+
+    def clear(self):
+        """Discard the waiting samples and forget the drops, e.g. with the table"""
+        with self._lock:
+            self._samples.clear()
+            self.dropped = 0
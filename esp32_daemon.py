@@ -0,0 +1,149 @@
+"""Headless ESP32 logger for machines without a display
+
+Runs the same acquisition loop as the GUI, without importing PyQt6:
+
+    python esp32_daemon.py --port COM4 --interval 00:00:01 --output datas.csv
+    python esp32_daemon.py --stream --interval 00:00:00.010 --format journal
+    python esp32_daemon.py --format sqlite --output datas.db
+    python esp32_daemon.py --format archive --output archive --period day --compression xz
+
+With --metrics FILE, stage timings and error counters are written there
+every 10 s (Prometheus text, or JSON for a .json name). With --serve PORT,
+other programs can follow the samples on ws://127.0.0.1:PORT/stream and
+query recent ones on http://127.0.0.1:PORT/samples.
+
+Stops cleanly on Ctrl+C or SIGTERM: the loop finishes the current read, the
+output is flushed and closed, then the port is released.
+"""
+import argparse
+import signal
+import sqlite3
+import sys
+from acquisition_loop import AcquisitionLoop
+from archive import ArchiveWriter, COMPRESSIONS, PERIODS
+from csv_format import CsvSampleWriter
+from esp32_manager import ESP32Manager
+from metrics import METRICS, MetricsExporter
+from recording_format import RecordingWriter
+from sample_journal import SampleJournal
+from sample_store import SampleStore
+from sampling_scheduler import parse_interval
+
+FORMATS = ('csv', 'journal', 'wrec', 'sqlite', 'archive')
+DEFAULT_OUTPUT = {
+    'csv': 'datas.csv', 'journal': 'session.journal', 'wrec': 'datas.wrec', 'sqlite': 'datas.db', 'archive': 'archive'
+}
+
+
+def open_sink(output_format, path, period='hour', compression='gzip'):
+    """Storage object with append(timestamp, values), flush() and close()"""
+    if output_format == 'csv':
+        return CsvSampleWriter(path)
+    if output_format == 'journal':
+        journal = SampleJournal(path)
+        journal.open()
+        return journal
+    if output_format == 'sqlite':
+        return SampleStore(path)
+    if output_format == 'archive':
+        return ArchiveWriter(path, period, compression)
+    return RecordingWriter(path)
+
+
+def parse_args(argv=None):
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Log ESP32 GPIO samples without a GUI")
+    parser.add_argument('--port', default=None, help="Serial port; searched for when omitted")
+    parser.add_argument('--baud', type=int, default=115200, help="Baud rate")
+    parser.add_argument('--interval', default='00:00:01', help="Sampling interval hh:mm:ss[.fff]")
+    parser.add_argument('--stream', action='store_true', help="Let the board push samples (streaming mode)")
+    parser.add_argument('--batch', type=int, default=10, help="Samples per frame in streaming mode")
+    parser.add_argument('--protocol', choices=('auto', 'text'), default='auto', help="Wire protocol")
+    parser.add_argument('--format', choices=FORMATS, default='csv', help="Output format")
+    parser.add_argument('--output', default=None, help="Output file, or folder for archives (default depends on the format)")
+    parser.add_argument('--period', choices=PERIODS, default='hour', help="Archive bucket length")
+    parser.add_argument('--compression', choices=list(COMPRESSIONS), default='gzip', help="Archive compression")
+    parser.add_argument('--quiet', action='store_true', help="Do not print every sample")
+    parser.add_argument('--metrics', default=None, help="Export metrics to this file (.prom or .json)")
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT', help="Publish live samples on this localhost port")
+    args = parser.parse_args(argv)
+    try:
+        args.interval_seconds = parse_interval(args.interval)
+    except ValueError as e:
+        parser.error(f"--interval: {e}")
+    if args.output is None:
+        args.output = DEFAULT_OUTPUT[args.format]
+    return args
+
+
+def main(argv=None):
+    """Run until interrupted; returns the process exit code"""
+    args = parse_args(argv)
+    try:
+        sink = open_sink(args.format, args.output, args.period, args.compression)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"❌ Cannot open {args.output}: {e}")
+        return 1
+    sinks = [sink]
+    server = None
+    if args.serve is not None:
+        from live_server import LiveServer  # asyncio is only imported when serving
+        server = LiveServer(port=args.serve)
+        try:
+            server.start()
+        except OSError as e:
+            print(f"❌ Cannot serve live data on port {args.serve}: {e}")
+            sink.close()
+            return 1
+        sinks.append(server)
+
+    received = [0]
+
+    def on_sample(timestamp, values):
+        received[0] += 1
+        if not args.quiet:
+            print(f"✅ {values}")
+
+    esp32 = ESP32Manager(port=args.port, baud_rate=args.baud, autoconnect=False, protocol=args.protocol)
+    loop = AcquisitionLoop(
+        esp32,
+        sinks=sinks,
+        on_sample=on_sample,
+        on_no_data=lambda: print("⚠️  No data received from ESP32"),
+        on_connection=lambda connected: print("✅ ESP32 connected" if connected else "❌ ESP32 disconnected")
+    )
+
+    def stop(signum, frame):
+        # Only sets events, the loop notices them within one read timeout
+        loop.shutdown()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if hasattr(signal, 'SIGBREAK'):  # Ctrl+Break on Windows
+        signal.signal(signal.SIGBREAK, stop)
+
+    exporter = MetricsExporter(METRICS, args.metrics) if args.metrics else None
+    if exporter is not None:
+        exporter.start()
+
+    mode = "streaming" if args.stream else "polling"
+    print(f"▶️ {mode} every {args.interval_seconds:g} s into {args.output} ({args.format})")
+    loop.start_acquisition(args.interval_seconds, streaming=args.stream, batch=args.batch)
+    try:
+        loop.run()
+    finally:
+        if esp32.streaming:
+            esp32.stop_stream()
+        loop.flush_sinks()
+        sink.close()
+        if server is not None:
+            server.close()
+        esp32.disconnect()
+        if exporter is not None:
+            exporter.stop()
+    print(f"\n🛑 Stopped, {received[0]} samples written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,45 +1,187 @@
-import serial
 import time
-import re
+from collections import deque
 from datetime import datetime
+from frame_parser import FrameParser
+from binary_protocol import BinaryFrameDecoder, PROTO_ACK, PROTO_COMMAND
+from metrics import METRICS
+
+# Boards reset when the port opens; this is how long they take to boot
+BOOT_TIME = 2.0
+
+# Error counters of FrameParser / BinaryFrameDecoder copied into METRICS
+PARSER_ERRORS = ('garbled_lines', 'crc_errors', 'bytes_skipped')
+
+_pyserial = None
+
+
+def _serial():
+    """The pyserial module, imported on first use
+
+    Importing pyserial is a noticeable part of the GUI start; deferring it
+    to the first connect lets the window show first.
+    """
+    global _pyserial
+    if _pyserial is None:
+        import serial
+        import serial.tools.list_ports
+        _pyserial = serial
+    return _pyserial
+
+
+def _pause(seconds, stop_event=None):
+    """Sleep that returns early (False) when stop_event gets set"""
+    if stop_event is None:
+        time.sleep(seconds)
+        return True
+    return not stop_event.wait(seconds)
+
+
+def probe_port(port, baud_rate=115200, timeout=1.0, answer_timeout=2.0, stop_event=None):
+    """Check whether an ESP32 speaking our protocol sits on a port
+
+    Sends "read" after the board has booted and waits for a complete
+    ':' ... ';' frame.
+    :return: The open serial.Serial on success, otherwise None
+    """
+    try:
+        ser = _serial().Serial(port, baud_rate, timeout=0.1)
+    except (_serial().SerialException, OSError):
+        return None
+    try:
+        if not _pause(BOOT_TIME, stop_event):
+            ser.close()
+            return None
+        ser.reset_input_buffer()
+        ser.write(b"read\n")
+        parser = FrameParser()
+        deadline = time.monotonic() + answer_timeout
+        while time.monotonic() < deadline:
+            data = ser.read(ser.in_waiting or 1)
+            if data and parser.feed(data):
+                ser.timeout = timeout
+                return ser
+    except (_serial().SerialException, OSError):
+        pass
+    ser.close()
+    return None
+
+
+def discover_port(baud_rate=115200, timeout=1.0, exclude=(), stop_event=None):
+    """Scan the serial ports for an ESP32 answering the protocol
+
+    :return: (port name, open serial.Serial) or (None, None)
+    """
+    for info in _serial().tools.list_ports.comports():
+        if info.device in exclude:
+            continue
+        if stop_event is not None and stop_event.is_set():
+            break
+        ser = probe_port(info.device, baud_rate, timeout, stop_event=stop_event)
+        if ser is not None:
+            return info.device, ser
+    return None, None
+
 
 class ESP32Manager:
-    def __init__(self, port='COM4', baud_rate=115200, timeout=1.0):
-        """Initialize the ESP32 manager with connection parameters"""
+    def __init__(self, port='COM4', baud_rate=115200, timeout=1.0, autoconnect=True, protocol='auto'):
+        """Initialize the ESP32 manager with connection parameters
+
+        :param port: Serial port, or None to search all ports for the board
+        :param autoconnect: Connect right away (blocks while the board boots)
+        :param protocol: 'text' for "gpio X Y" lines, 'auto' to try binary
+                         framing at connect and fall back to text
+        """
         self.port = port
+        self.protocol = protocol
+        self.wire_protocol = 'text'  # Protocol agreed with the board
         self.baud_rate = baud_rate
         self.timeout = timeout
         self.ser = None
         self.connected = False
+        self.active_port = None  # Port actually in use, also when discovered
+        self.parser = FrameParser()
+        self._frames = deque()  # (receipt time, device time, values) not yet handed out
+        self._counted_parser = None  # Parser whose error counts are in _counted_errors
+        self._counted_errors = {}
+        self.streaming = False
+
+        if autoconnect:
+            self.connect()
 
-        self.connect()
+    def connect(self, stop_event=None):
+        """Establish connection with ESP32
 
-    def connect(self):
-        """Establish connection with ESP32"""
+        :param stop_event: threading.Event that cuts the boot wait short
+        """
         try:
             # Close existing connection if open
             if self.ser and self.ser.is_open:
                 self.ser.close()
 
-            # Attempt to connect to ESP32
-            self.ser = serial.Serial(self.port, self.baud_rate, timeout=self.timeout)
-            print(f"✅ Connected to ESP32 on port {self.port}")
+            if self.port is None:
+                # Probe every port; the winner is already open and booted
+                port, self.ser = discover_port(self.baud_rate, self.timeout, stop_event=stop_event)
+                if port is None:
+                    print("❌ ESP32 not found on any serial port")
+                    self.connected = False
+                    return False
+            else:
+                # Attempt to connect to ESP32
+                port = self.port
+                self.ser = _serial().Serial(port, self.baud_rate, timeout=self.timeout)
 
-            # Allow time for initialization
-            time.sleep(2)
+                # Allow time for initialization
+                if not _pause(BOOT_TIME, stop_event):
+                    self.ser.close()
+                    self.connected = False
+                    return False
+
+            self.active_port = port
+            print(f"✅ Connected to ESP32 on port {port}")
 
             # Clear input buffer
-            while self.ser.in_waiting:
-                self.ser.readline()
+            self.ser.reset_input_buffer()
+            self.parser = FrameParser()
+            self.wire_protocol = 'text'
+            self._frames.clear()
+
+            if self.protocol != 'text':
+                self.negotiate_protocol()
 
             self.connected = True
+            self.streaming = False
             return True
 
-        except serial.SerialException as e:
+        except _serial().SerialException as e:
             print(f"❌ ESP32 connection error: {e}")
             self.connected = False
             return False
 
+    def negotiate_protocol(self, answer_timeout=0.5):
+        """Ask the board for binary framing; keep text if it does not agree
+
+        Boards with older firmware ignore "proto bin", so after answer_timeout
+        without "ok bin" the text parser stays in place.
+        """
+        self.ser.write(PROTO_COMMAND)
+        received = bytearray()
+        deadline = time.monotonic() + answer_timeout
+        while time.monotonic() < deadline:
+            received += self.ser.read(self.ser.in_waiting or 1)
+            ack = received.find(PROTO_ACK)
+            if ack >= 0:
+                end = received.find(b'\n', ack)
+                if end < 0:
+                    continue
+                self.parser = BinaryFrameDecoder()
+                self.wire_protocol = 'binary'
+                self._queue(bytes(received[end + 1:]))
+                print("⚡ Using binary protocol")
+                return True
+        # Whatever arrived meanwhile is ordinary text traffic
+        self._queue(bytes(received))
+        return False
+
     def disconnect(self):
         """Disconnect from ESP32"""
         if self.ser and self.ser.is_open:
@@ -47,53 +189,147 @@ class ESP32Manager:
         self.connected = False
         print("🔌 Disconnected from ESP32")
 
-    def read_sensor_data(self):
-        """Read sensor data from ESP32 in format :gpio X Y,...,gpio X Y;"""
+    def read_sensor_data(self, frame_timeout=None, stop_event=None):
+        """Read sensor data from ESP32 in format :gpio X Y,...,gpio X Y;
+
+        :param frame_timeout: Give up after this many seconds without a complete frame
+        :param stop_event: threading.Event that aborts the read when set
+        """
+        sample = self.read_sample(frame_timeout, stop_event)
+        return None if sample is None else sample[2]
+
+    def read_sample(self, frame_timeout=None, stop_event=None):
+        """Like read_sensor_data, but also report when the frame arrived
+
+        A board that pushes frames faster than they are read leaves a backlog;
+        only the newest frame is returned and the older ones are dropped and
+        counted in METRICS as stale_frames.
+        :return: (receipt time in epoch seconds, device time in ms or None, values) or None
+        """
         if not self.connected:
             return None
 
+        deadline = None if frame_timeout is None else time.monotonic() + frame_timeout
+
         try:
-            # Look for data start symbol ':'
-            while self.connected:
-                if self.ser.in_waiting:
-                    line = self.ser.readline().decode('utf-8', errors='replace').strip()
-                    if line == ':':
-                        break
-                    # Small delay to prevent CPU overload
-                    time.sleep(0.01)
-
-            # Collect data until symbol ';'
-            data_lines = []
-            while self.connected:
-                if self.ser.in_waiting:
-                    line = self.ser.readline().decode('utf-8', errors='replace').strip()
-                    if line == ';':
-                        break
-                    elif line and line != ',':
-                        data_lines.append(line)
-                # Small delay to prevent CPU overload
-                time.sleep(0.01)
-
-            # Process collected data
-            sensor_data = {}
-            for line in data_lines:
-                # Look for pattern "gpio X Y"
-                match = re.match(r'gpio\s+(\d+)\s+(\d+)', line)
-                if match:
-                    gpio_num = match.group(1)
-                    value = match.group(2)
-                    sensor_data[f"GPIO{gpio_num}"] = value
-
-            if sensor_data:
-                return sensor_data
+            if self.ser.in_waiting:
+                self._read_available()
+            while not self._frames:
+                if not self.connected:
+                    return None
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                if deadline is not None and time.monotonic() >= deadline:
+                    METRICS.count('frame_timeouts')
+                    return None
+                self._read_available()
 
-            return None
+            frame = self._frames.pop()
+            if self._frames:
+                METRICS.count('stale_frames', len(self._frames))
+                self._frames.clear()
+            return frame
 
         except Exception as e:
             print(f"❌ Error reading data: {e}")
+            METRICS.count('read_errors')
             self.connected = False
             return None
 
+    def start_stream(self, interval_ms, batch=10):
+        """Ask the board to push a sample every interval_ms, batch samples per frame
+
+        The board answers with frames of "t MILLIS" + "gpio X Y" groups until
+        stop_stream() is called; no per-sample request is needed.
+        """
+        if not self.connected:
+            return False
+        try:
+            self.ser.write(f"stream {int(interval_ms)} {int(batch)}\n".encode())
+            self.streaming = True
+            return True
+        except Exception as e:
+            print(f"❌ Error starting stream: {e}")
+            self.connected = False
+            return False
+
+    def stop_stream(self):
+        """Tell the board to stop pushing samples"""
+        if not self.connected or not self.streaming:
+            return
+        try:
+            self.ser.write(b"stop\n")
+        except Exception as e:
+            print(f"❌ Error stopping stream: {e}")
+            self.connected = False
+        self.streaming = False
+
+    def read_samples(self, frame_timeout=None, stop_event=None):
+        """Wait for at least one frame and return every decoded sample available
+
+        :return: List of (receipt time, device time in ms or None, values)
+        """
+        if not self.connected:
+            return []
+
+        deadline = None if frame_timeout is None else time.monotonic() + frame_timeout
+
+        try:
+            while not self._frames:
+                if not self.connected:
+                    return []
+                if stop_event is not None and stop_event.is_set():
+                    return []
+                if deadline is not None and time.monotonic() >= deadline:
+                    METRICS.count('frame_timeouts')
+                    return []
+                self._read_available()
+            if self.ser.in_waiting:
+                self._read_available()
+        except Exception as e:
+            print(f"❌ Error reading data: {e}")
+            METRICS.count('read_errors')
+            self.connected = False
+
+        samples = list(self._frames)
+        self._frames.clear()
+        return samples
+
+    def _read_available(self):
+        """Read everything buffered by the driver in one call and parse it
+
+        Blocks for at most the serial timeout when nothing is buffered yet, so
+        a frame is picked up as soon as its bytes arrive.
+        """
+        with METRICS.timed('serial_read'):
+            data = self.ser.read(self.ser.in_waiting or 1)
+        if data:
+            self._queue(data)
+
+    def _queue(self, data):
+        """Parse bytes and queue the samples with the time they arrived"""
+        receipt = time.time()
+        with METRICS.timed('parse'):
+            samples = self.parser.feed_samples(data)
+        self._frames.extend((receipt, device_time, values) for device_time, values in samples)
+        METRICS.count('bytes_received', len(data))
+        if samples:
+            METRICS.count('samples_parsed', len(samples))
+        self._count_parser_errors()
+
+    def _count_parser_errors(self):
+        """Add the parser's new garbled lines, CRC errors and skipped bytes to METRICS"""
+        if self._counted_parser is not self.parser:
+            # A fresh parser after connect or protocol negotiation starts from zero
+            self._counted_parser = self.parser
+            self._counted_errors = {}
+        for name in PARSER_ERRORS:
+            value = getattr(self.parser, name, 0)
+            new = value - self._counted_errors.get(name, 0)
+            if new:
+                METRICS.count(name, new)
+                self._counted_errors[name] = value
+
     def is_connected(self):
         """Check if connected to ESP32"""
         return self.connected
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""Virtual ESP32 on a pseudo-terminal, for testing without a board
+
+    python esp32_simulator.py --rate 100 --pins 4,5,12 --jitter 0.002 --corruption 0.01
+
+prints a port such as /dev/pts/3 that main.py, esp32_daemon.py or
+ESP32Manager can open like a real board. The simulator speaks the firmware
+protocol:
+
+    pushes a ':' / 'gpio X Y' / ',' / ';' frame `rate` times per second
+    "read"          answers with one frame right away
+    "stream MS N"   frames of N samples, each after a "t MILLIS" line, one sample every MS ms
+    "stop"          back to plain frames
+    "proto bin"     answers "ok bin" and switches to binary framing (unless disabled)
+
+Needs a POSIX system for the pty module.
+"""
+import argparse
+import math
+import os
+import random
+import select
+import threading
+import time
+from binary_protocol import PROTO_ACK, encode_frame
+
+
+def encode_text_frame(samples):
+    """Text frame for a list of (device millis or None, {pin: value})"""
+    lines = [b':']
+    for device_time, pins in samples:
+        if device_time is not None:
+            lines.append(b't %d' % device_time)
+        for i, (pin, value) in enumerate(pins.items()):
+            if i:
+                lines.append(b',')
+            lines.append(b'gpio %d %d' % (pin, value))
+    lines.append(b';')
+    return b'\r\n'.join(lines) + b'\r\n'
+
+
+class SimulatedESP32:
+    """ESP32 stand-in served on the master side of a pty
+
+    A writer thread produces frames on schedule: when it falls behind, every
+    frame due is sent in one write, so high rates are limited by the reader,
+    not by sleep resolution. A reader thread handles the host commands.
+    """
+
+    def __init__(self, rate=10.0, pins=(4, 5), jitter=0.0, corruption=0.0, binary=True, seed=None):
+        """
+        :param rate: Plain frames pushed per second, 0 = only on "read"
+        :param pins: GPIO numbers reported in every sample
+        :param jitter: Maximum random delay added before a write, seconds
+        :param corruption: Probability that a frame is damaged on the wire
+        :param binary: Accept "proto bin"
+        :param seed: Random seed for reproducible runs
+        """
+        self.rate = rate
+        self.pins = list(pins)
+        self.jitter = jitter
+        self.corruption = corruption
+        self.binary = binary
+        self.port = None
+        self.frames_sent = 0
+        self.samples_sent = 0
+        self.bytes_sent = 0
+        self.frames_corrupted = 0
+        self._random = random.Random(seed)
+        self._master = None
+        self._slave = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps "ok bin" out of a half-written frame
+        self._threads = []
+        self._boot = time.monotonic()
+        self._stream = None  # (interval seconds, batch) while streaming
+        self._wire_binary = False
+        self._requests = 0  # Pending "read" commands
+
+    def start(self):
+        """Create the pty and start serving; returns the port name"""
+        import pty
+        import tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        # A blocking write to a full pty would hang stop()
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        for target in (self._read_commands, self._write_frames):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self.port
+
+    def stop(self):
+        """Stop the threads and close the pty"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Host commands ---
+
+    def _read_commands(self):
+        """Handle command lines written by the host"""
+        buffer = b''
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                buffer += os.read(self._master, 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                self._handle_command(line.strip().split())
+
+    def _handle_command(self, words):
+        """Apply one command"""
+        if not words:
+            return
+        with self._lock:
+            if words[0] == b'read':
+                self._requests += 1
+            elif words[0] == b'stream' and len(words) == 3:
+                self._stream = (max(int(words[1]), 1) / 1000.0, max(int(words[2]), 1))
+            elif words[0] == b'stop':
+                self._stream = None
+            elif words[:2] == [b'proto', b'bin'] and self.binary:
+                self._wire_binary = True
+                self._send(PROTO_ACK + b'\r\n')
+
+    # --- Frames ---
+
+    def _millis(self):
+        return int((time.monotonic() - self._boot) * 1000) & 0xFFFFFFFF
+
+    def _values(self, device_time):
+        """Slowly varying 12-bit readings, one per pin"""
+        return {
+            pin: int(2048 + 2000 * math.sin(device_time / 1000.0 + pin)) & 0xFFFF
+            for pin in self.pins
+        }
+
+    def _encode(self, samples, with_time):
+        """Frame bytes in the current wire format, possibly corrupted"""
+        if self._wire_binary:
+            frame = encode_frame(samples)
+        else:
+            frame = encode_text_frame(samples if with_time else [(None, pins) for _, pins in samples])
+        if self.corruption and self._random.random() < self.corruption:
+            frame = self._corrupt(frame)
+        self.frames_sent += 1
+        self.samples_sent += len(samples)
+        return frame
+
+    def _corrupt(self, frame):
+        """Flip a byte, cut the frame short or splice in noise"""
+        self.frames_corrupted += 1
+        frame = bytearray(frame)
+        kind = self._random.randrange(3)
+        position = self._random.randrange(len(frame))
+        if kind == 0:
+            frame[position] ^= 1 << self._random.randrange(8)
+        elif kind == 1:
+            del frame[position:]
+        else:
+            frame[position:position] = bytes(self._random.randrange(256) for _ in range(8))
+        return bytes(frame)
+
+    def _write_frames(self):
+        """Produce frames on schedule until stopped"""
+        started = time.monotonic()
+        pushed = 0
+        streamed = 0
+        stream = None
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                requests, self._requests = self._requests, 0
+                if self._stream != stream:
+                    stream = self._stream
+                    started, pushed, streamed = now, 0, 0
+                    stream_start = self._millis()
+            out = []
+            for _ in range(requests):
+                out.append(self._encode([(self._millis(), self._values(self._millis()))], False))
+            if stream is not None:
+                interval, batch = stream
+                due = int((now - started) / interval) // batch
+                while streamed < due:
+                    # Times come from the schedule, so batches written in one
+                    # catch-up pass still follow each other
+                    times = [
+                        (stream_start + round((streamed * batch + i) * interval * 1000)) & 0xFFFFFFFF
+                        for i in range(batch)
+                    ]
+                    samples = [(t, self._values(t)) for t in times]
+                    out.append(self._encode(samples, True))
+                    streamed += 1
+            elif self.rate > 0:
+                due = int((now - started) * self.rate)
+                # A host that stopped reading gets at most a second of backlog
+                pushed = max(pushed, due - int(self.rate))
+                while pushed < due:
+                    t = self._millis()
+                    out.append(self._encode([(t, self._values(t))], False))
+                    pushed += 1
+            if out:
+                if self.jitter:
+                    time.sleep(self._random.uniform(0, self.jitter))
+                self._send(b''.join(out))
+            else:
+                time.sleep(0.0005)
+
+    def _send(self, data):
+        """Write everything unless stopped; waits while the host is not reading"""
+        view = memoryview(data)
+        with self._write_lock:
+            while view and not self._stop.is_set():
+                _, writable, _ = select.select([], [self._master], [], 0.1)
+                if not writable:
+                    continue
+                try:
+                    written = os.write(self._master, view)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    return
+                self.bytes_sent += written
+                view = view[written:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated ESP32 on a pseudo-terminal")
+    parser.add_argument('--rate', type=float, default=10.0, help="Frames per second pushed without streaming")
+    parser.add_argument('--pins', default='4,5', help="Comma separated GPIO numbers")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum extra delay per write, seconds")
+    parser.add_argument('--corruption', type=float, default=0.0, help="Probability a frame is damaged")
+    parser.add_argument('--text-only', action='store_true', help="Refuse the binary protocol")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    simulator = SimulatedESP32(
+        rate=args.rate,
+        pins=[int(pin) for pin in args.pins.split(',') if pin],
+        jitter=args.jitter,
+        corruption=args.corruption,
+        binary=not args.text_only,
+        seed=args.seed
+    )
+    port = simulator.start()
+    print(f"🔌 Simulated ESP32 on {port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+    print(f"\n🛑 Sent {simulator.frames_sent} frames, {simulator.samples_sent} samples, "
+          f"{simulator.bytes_sent} bytes, {simulator.frames_corrupted} corrupted")
+
+
+if __name__ == '__main__':
+    main()
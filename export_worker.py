@@ -0,0 +1,139 @@
+import csv
+import gzip
+import io
+import os
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from csv_format import DATE_FORMAT, format_time, format_value
+from metrics import METRICS
+from recording_format import RecordingWriter
+
+# File dialog filter -> extension
+EXPORT_FORMATS = [
+    ("CSV (*.csv)", '.csv'),
+    ("CSV, gzip (*.csv.gz)", '.csv.gz'),
+    ("Binary recording (*.wrec)", '.wrec'),
+]
+
+
+class ExportCancelled(Exception):
+    """Raised inside export_snapshot when the caller asks to stop"""
+
+
+class _CsvExport:
+    """Date;Time;GPIO... rows, plain or gzip-compressed"""
+
+    def __init__(self, path, headers, compressed):
+        if compressed:
+            self._file = io.TextIOWrapper(gzip.open(path, 'wb', compresslevel=6), encoding='utf-8', newline='')
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file, delimiter=';')
+        self._writer.writerow(headers)
+        self._names = headers[2:]
+
+    def write(self, timestamp, values):
+        if timestamp is None:
+            row = ["", ""]
+        else:
+            moment = time.localtime(timestamp)
+            row = [time.strftime(DATE_FORMAT, moment), format_time(moment, timestamp)]
+        for name in self._names:
+            value = values.get(name)
+            row.append("" if value is None else format_value(value))
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+class _RecordingExport:
+    """Samples into a .wrec recording; rows without a timestamp are left out"""
+
+    def __init__(self, path):
+        self._writer = RecordingWriter(path)
+
+    def write(self, timestamp, values):
+        if timestamp is not None:
+            self._writer.append(timestamp, values)
+
+    def close(self):
+        self._writer.close()
+
+
+def export_snapshot(snapshot, path, progress=None, cancelled=None, report_every=2000):
+    """Write a TableSnapshot to path; the format follows the extension
+
+    The data goes to path + '.part' first and replaces path only when
+    complete, so a failed or cancelled export leaves any old file intact.
+
+    :param progress: Called as progress(rows written, total rows)
+    :param cancelled: Callable returning True to stop; raises ExportCancelled
+    :return: Rows written
+    """
+    temp_path = path + '.part'
+    if path.endswith('.wrec'):
+        writer = _RecordingExport(temp_path)
+    else:
+        writer = _CsvExport(temp_path, snapshot.headers(), compressed=path.endswith('.gz'))
+    total = len(snapshot)
+    written = 0
+    try:
+        with METRICS.timed('export'):
+            for timestamp, values in snapshot.iter_rows():
+                if written % report_every == 0:
+                    if cancelled is not None and cancelled():
+                        raise ExportCancelled()
+                    if progress is not None:
+                        progress(written, total)
+                writer.write(timestamp, values)
+                written += 1
+            writer.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if progress is not None:
+        progress(written, total)
+    return written
+
+
+class ExportWorker(QThread):
+    """Writes a table snapshot to a file without blocking the GUI
+
+    Exactly one of succeeded, failed or cancelled is emitted at the end.
+    Cancel with requestInterruption().
+    """
+
+    progress = pyqtSignal(int, int)  # Rows written, total rows
+    succeeded = pyqtSignal(str, int)  # Path, rows written
+    failed = pyqtSignal(str)  # Error message
+    cancelled = pyqtSignal()
+
+    def __init__(self, snapshot, path, parent=None):
+        """
+        :param snapshot: data_model.TableSnapshot to write
+        :param path: Output file, .csv, .csv.gz or .wrec
+        """
+        super().__init__(parent)
+        self.snapshot = snapshot
+        self.path = path
+
+    def run(self):
+        """Write the file and report how it went"""
+        try:
+            rows = export_snapshot(self.snapshot, self.path, self.progress.emit, self.isInterruptionRequested)
+        except ExportCancelled:
+            print(f"🛑 Export to {self.path} cancelled")
+            self.cancelled.emit()
+        except Exception as e:
+            print(f"❌ Error saving file: {e}")
+            self.failed.emit(str(e))
+        else:
+            print(f"💾 Saved {rows} rows to {self.path}")
+            self.succeeded.emit(self.path, rows)
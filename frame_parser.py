@@ -0,0 +1,136 @@
+import re
+from sample_schema import gpio_name
+
+# Pattern "gpio X Y" matched directly on raw bytes
+GPIO_LINE = re.compile(rb'gpio\s+(\d+)\s+(\d+)')
+# Pattern "t MILLIS": device clock of the sample that follows (streaming mode)
+TIME_LINE = re.compile(rb't\s+(\d+)$')
+
+
+class FrameParser:
+    """Incremental parser for the ESP32 frame grammar
+
+    A frame looks like this, one token per line:
+        :
+        gpio X Y
+        ,
+        gpio X Y
+        ;
+    Bytes may arrive in arbitrary chunks; partial lines are kept in a buffer
+    until the rest shows up. Values are returned as integers under shared
+    "GPIO<pin>" name strings.
+
+    In streaming mode the board batches several samples into one frame, each
+    introduced by a "t MILLIS" line carrying the device clock:
+        :
+        t 1200
+        gpio X Y
+        t 1300
+        gpio X Y
+        ;
+    """
+
+    WAIT_START = 0
+    IN_FRAME = 1
+
+    # Longest line we are willing to buffer while waiting for '\n'
+    MAX_LINE = 4096
+
+    def __init__(self):
+        """Create a parser waiting for the first ':'"""
+        self._buffer = bytearray()
+        self._state = self.WAIT_START
+        self._current = {}
+        self._device_time = None
+        self._samples = []  # (device time, values) already closed in this frame
+        self.frames_parsed = 0
+        self.garbled_lines = 0
+
+    def reset(self):
+        """Drop any partial data, e.g. after a reconnect"""
+        self._buffer.clear()
+        self._state = self.WAIT_START
+        self._current = {}
+        self._device_time = None
+        self._samples = []
+
+    def feed(self, data):
+        """Consume a chunk of bytes and return the completed frames as value dicts
+
+        A batched frame contributes one dict per sample.
+        """
+        return [values for _, values in self.feed_samples(data)]
+
+    def feed_samples(self, data):
+        """Consume a chunk of bytes and return (device time ms or None, values) per sample"""
+        samples = []
+        buffer = self._buffer
+        buffer += data
+
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                frame = self._handle_line(line)
+                if frame is not None:
+                    samples.extend(frame)
+        del buffer[:start]
+
+        if len(buffer) > self.MAX_LINE:
+            # No line terminator in sight: treat it as noise
+            buffer.clear()
+            self.garbled_lines += 1
+
+        return samples
+
+    def _close_sample(self):
+        """Move the sample being collected into the frame's sample list"""
+        if self._current:
+            self._samples.append((self._device_time, self._current))
+        self._current = {}
+
+    def _handle_line(self, line):
+        """Advance the state machine by one line; return a frame's samples when it completes"""
+        if line == b':':
+            if self._state == self.IN_FRAME and (self._current or self._samples):
+                # Previous frame never got its ';'
+                self.garbled_lines += 1
+            self._state = self.IN_FRAME
+            self._current = {}
+            self._device_time = None
+            self._samples = []
+            return None
+
+        if self._state != self.IN_FRAME:
+            # Anything outside a frame (greeting, echo) is ignored
+            return None
+
+        if line == b';':
+            self._state = self.WAIT_START
+            self._close_sample()
+            frame, self._samples = self._samples, []
+            self._device_time = None
+            if not frame:
+                return None
+            self.frames_parsed += 1
+            return frame
+
+        if line == b',':
+            return None
+
+        match = TIME_LINE.match(line)
+        if match:
+            self._close_sample()
+            self._device_time = int(match.group(1))
+            return None
+
+        match = GPIO_LINE.match(line)
+        if match:
+            self._current[gpio_name(int(match.group(1)))] = int(match.group(2))
+        else:
+            self.garbled_lines += 1
+        return None
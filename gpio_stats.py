@@ -0,0 +1,334 @@
+"""Rolling statistics and time-bucket resampling of GPIO series
+
+RollingStats follows the live stream sample by sample. resample() and
+load_csv() work in bulk on NumPy arrays, so hourly averages over millions of
+recorded rows take a fraction of a second:
+
+    timestamps, columns = load_csv('datas.csv')
+    starts, stats = resample(timestamps, columns, 'hour')
+    stats['GPIO4']['mean']  # One value per hour
+"""
+import csv
+import io
+import math
+import time
+import numpy as np
+from archive import open_archive
+from csv_format import TimestampParser, parse_value
+
+BUCKETS = {'minute': 60, 'hour': 3600, 'day': 86400}
+STATS = ('count', 'mean', 'min', 'max', 'std')
+
+
+class _RollingSeries:
+    """Ring of the last `window` values of one GPIO with running sums"""
+
+    def __init__(self, window):
+        self.ring = np.empty(window)
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def push(self, value):
+        window = len(self.ring)
+        slot = self.count % window
+        if self.count >= window:
+            old = float(self.ring[slot])
+            self.total -= old
+            self.squares -= old * old
+        self.ring[slot] = value
+        self.total += value
+        self.squares += value * value
+        self.count += 1
+        if self.count % window == 0:
+            # Once per lap, so rounding errors cannot pile up
+            self.total = float(self.ring.sum())
+            self.squares = float(np.dot(self.ring, self.ring))
+
+
+class RollingStats:
+    """Mean, min, max and standard deviation over the last `window` samples of every GPIO
+
+    update() costs O(1) per value; min and max are taken from the window only
+    when stats() is called.
+    """
+
+    def __init__(self, window=100):
+        """
+        :param window: Samples per GPIO the statistics cover
+        """
+        self.window = window
+        self._series = {}  # Name -> _RollingSeries
+
+    def update(self, values):
+        """Add one sample; values maps name -> number or numeric string"""
+        for name, raw in values.items():
+            value = parse_value(raw)
+            if value != value:
+                continue
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _RollingSeries(self.window)
+            series.push(value)
+
+    def names(self):
+        """GPIOs seen so far, sorted"""
+        return sorted(self._series)
+
+    def stats(self, name):
+        """Dict with count, mean, min, max and std of one GPIO, or None"""
+        series = self._series.get(name)
+        if series is None:
+            return None
+        count = min(series.count, self.window)
+        values = series.ring[:count]
+        mean = series.total / count
+        return {
+            'count': count,
+            'mean': mean,
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'std': math.sqrt(max(series.squares / count - mean * mean, 0.0)),
+        }
+
+    def snapshot(self):
+        """stats() of every GPIO"""
+        return {name: self.stats(name) for name in self.names()}
+
+    def clear(self):
+        """Forget every series"""
+        self._series = {}
+
+
+def _utc_offsets(timestamps):
+    """Local UTC offset in seconds at every timestamp
+
+    Offsets are looked up once per day; only days with a DST switch are
+    resolved hour by hour.
+    """
+    if not len(timestamps):
+        return np.zeros(0)
+    days = np.floor(timestamps / 86400).astype(np.int64)
+    first, last = int(days.min()), int(days.max())
+    table = np.array([time.localtime(d * 86400).tm_gmtoff for d in range(first, last + 2)], dtype=float)
+    offsets = table[days - first]
+    switching = np.flatnonzero(table[:-1] != table[1:]) + first
+    for day in switching:
+        inside = np.flatnonzero(days == day)
+        hours = np.floor(timestamps[inside] / 3600).astype(np.int64)
+        for hour in np.unique(hours):
+            offsets[inside[hours == hour]] = time.localtime(int(hour) * 3600).tm_gmtoff
+    return offsets
+
+
+def resample(timestamps, columns, bucket='hour'):
+    """Aggregate samples into calendar buckets in local time
+
+    :param timestamps: Epoch seconds, any sequence or array
+    :param columns: Dict name -> values (NaN = missing), same length
+    :param bucket: 'minute', 'hour', 'day' or a bucket length in seconds
+    :return: (bucket start times as epoch seconds,
+              {name: {'count', 'mean', 'min', 'max', 'std': array per bucket}})
+              Only buckets containing at least one sample are returned.
+    """
+    seconds = BUCKETS[bucket] if isinstance(bucket, str) else float(bucket)
+    timestamps = np.asarray(timestamps, dtype=float)
+    if not len(timestamps):
+        return np.zeros(0), {name: {stat: np.zeros(0) for stat in STATS} for name in columns}
+
+    offsets = _utc_offsets(timestamps)
+    keys = np.floor((timestamps + offsets) / seconds)
+    order = None
+    if np.any(keys[1:] < keys[:-1]):
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        offsets = offsets[order]
+    firsts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    starts = keys[firsts] * seconds - offsets[firsts]
+    bucket_of = np.repeat(np.arange(len(firsts)), np.diff(np.append(firsts, len(keys))))
+
+    result = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name, column in columns.items():
+            values = np.asarray(column, dtype=float)
+            if order is not None:
+                values = values[order]
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            count = np.add.reduceat(present.astype(np.int64), firsts)
+            mean = np.add.reduceat(filled, firsts) / count
+            # Second pass around the bucket mean keeps the deviation exact
+            deviation = np.where(present, values - mean[bucket_of], 0.0)
+            result[name] = {
+                'count': count,
+                'mean': mean,
+                'min': np.fmin.reduceat(values, firsts),
+                'max': np.fmax.reduceat(values, firsts),
+                'std': np.sqrt(np.add.reduceat(deviation * deviation, firsts) / count),
+            }
+    return starts, result
+
+
+def concat(parts):
+    """Join (timestamps, columns) pieces; columns missing from a piece become NaN"""
+    names = []
+    for _, columns in parts:
+        names.extend(name for name in columns if name not in names)
+    timestamps = np.concatenate([np.asarray(t, dtype=float) for t, _ in parts]) if parts else np.zeros(0)
+    columns = {}
+    for name in sorted(names):
+        columns[name] = np.concatenate([
+            np.asarray(c[name], dtype=float) if name in c else np.full(len(t), np.nan)
+            for t, c in parts
+        ]) if parts else np.zeros(0)
+    return timestamps, columns
+
+
+def _digits(buf, positions):
+    """Digit values at byte positions; ValueError if any is not a digit"""
+    digits = buf[positions] - np.uint8(48)  # Wraps around for bytes below '0'
+    if np.any(digits > 9):
+        raise ValueError("not a digit")
+    return digits.astype(np.int32)
+
+
+def _parse_numbers(body, buf, starts, ends):
+    """Numbers of one CSV column; integers are decoded without Python calls"""
+    lengths = ends - starts
+    values = np.full(len(starts), np.nan)
+    width = int(lengths.max()) if len(lengths) else 0
+    if width == 0:
+        return values
+    negative = (buf[starts] == 45) & (lengths > 1)
+    simple = (lengths > 0) & (width <= 15)
+    numbers = np.zeros(len(starts))
+    last = len(buf) - 1
+    # Horner's scheme one character position at a time, across all rows
+    for position in range(width):
+        inside = position < lengths
+        digits = buf[np.minimum(starts + position, last)] - np.uint8(48)
+        is_digit = digits <= 9
+        if position == 0:
+            simple &= is_digit | negative
+        else:
+            simple &= is_digit | ~inside
+        take = inside & is_digit
+        numbers[take] = numbers[take] * 10 + digits[take]
+    numbers[negative] *= -1
+    values[simple] = numbers[simple]
+    # Anything else ("1.5", "1e3", garbage) goes through float()
+    for i in np.flatnonzero((lengths > 0) & ~simple):
+        values[i] = parse_value(body[starts[i]:ends[i]].decode('utf-8', errors='replace'))
+    return values
+
+
+def _load_csv_fast(body, headers):
+    """Vectorised parse of a regular file; None when a row breaks the pattern"""
+    fields = len(headers)
+    date_field, time_field = headers.index("Date"), headers.index("Time")
+    buf = np.frombuffer(body, dtype=np.uint8)
+    newlines = buf == 10
+    ends = np.flatnonzero(newlines | (buf == 59))
+    rows = len(ends) // fields
+    if len(ends) != rows * fields:
+        return None
+    ends = ends.reshape(rows, fields)
+    # Every row ends in a newline and there are no others, so all rows
+    # have exactly `fields` fields
+    if np.count_nonzero(newlines) != rows or np.any(buf[ends[:, -1]] != 10):
+        return None
+    starts = np.empty_like(ends)
+    starts[:, 0] = np.concatenate(([0], ends[:-1, -1] + 1))
+    starts[:, 1:] = ends[:, :-1] + 1
+    # Drop the '\r' of CRLF line endings
+    last = ends[:, -1]
+    ends[:, -1] = last - ((last > starts[:, -1]) & (buf[last - 1] == 13))
+
+    dates, times = starts[:, date_field], starts[:, time_field]
+    # Times are hh:mm:ss, or hh:mm:ss.fff as the app writes them
+    time_lengths = ends[:, time_field] - times
+    if np.any(ends[:, date_field] - dates != 10) or np.any((time_lengths != 8) & (time_lengths != 12)):
+        return None
+    fractions = np.flatnonzero(time_lengths == 12)
+    try:
+        day = _digits(buf, dates) * 10 + _digits(buf, dates + 1)
+        month = _digits(buf, dates + 3) * 10 + _digits(buf, dates + 4)
+        year = (_digits(buf, dates + 6) * 1000 + _digits(buf, dates + 7) * 100
+                + _digits(buf, dates + 8) * 10 + _digits(buf, dates + 9))
+        seconds = ((_digits(buf, times) * 10 + _digits(buf, times + 1)) * 3600
+                   + (_digits(buf, times + 3) * 10 + _digits(buf, times + 4)) * 60
+                   + _digits(buf, times + 6) * 10 + _digits(buf, times + 7)).astype(np.float64)
+        if len(fractions):
+            if np.any(buf[times[fractions] + 8] != 46):  # '.'
+                return None
+            dots = times[fractions] + 8
+            seconds[fractions] += (_digits(buf, dots + 1) * 100 + _digits(buf, dots + 2) * 10
+                                   + _digits(buf, dots + 3)) / 1000
+    except ValueError:
+        return None
+    keys = year * 10000 + month * 100 + day
+    if np.all(keys[1:] >= keys[:-1]):
+        # Rows in time order: one lookup per run of equal dates
+        changes = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        inverse = np.cumsum(np.concatenate(([False], keys[1:] != keys[:-1])))
+        keys = keys[changes]
+    else:
+        keys, inverse = np.unique(keys, return_inverse=True)
+    try:
+        midnights = np.array([
+            time.mktime((int(k) // 10000, int(k) // 100 % 100, int(k) % 100, 0, 0, 0, 0, 0, -1))
+            for k in keys
+        ])
+    except (OverflowError, ValueError):
+        return None
+    timestamps = midnights[inverse] + seconds
+
+    columns = {}
+    for field, name in enumerate(headers):
+        if field not in (date_field, time_field):
+            columns[name] = _parse_numbers(body, buf, starts[:, field], ends[:, field])
+    return timestamps, columns
+
+
+def _load_csv_slow(path, headers):
+    """Row by row parse that tolerates short rows and malformed dates"""
+    date_field, time_field = headers.index("Date"), headers.index("Time")
+    parser = TimestampParser()
+    timestamps = []
+    values = {name: [] for name in headers if name not in ("Date", "Time")}
+    fields = [(headers.index(name), column) for name, column in values.items()]
+    with io.TextIOWrapper(open_archive(path, 'rb'), encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f, delimiter=';')
+        next(reader, None)
+        for row in reader:
+            if len(row) <= max(date_field, time_field):
+                continue
+            timestamp = parser.parse(row[date_field], row[time_field])
+            if timestamp is None:
+                continue
+            timestamps.append(timestamp)
+            for field, column in fields:
+                column.append(parse_value(row[field]) if field < len(row) else math.nan)
+    return np.array(timestamps, dtype=float), {name: np.array(column, dtype=float) for name, column in values.items()}
+
+
+def load_csv(path):
+    """Read a Date;Time;GPIO... file, plain or .gz/.xz/.zst, into NumPy arrays
+
+    :return: (epoch seconds, {name: float array with NaN for missing})
+    """
+    with open_archive(path, 'rb') as f:
+        data = f.read()
+    header_end = data.find(b'\n')
+    if header_end < 0:
+        return np.zeros(0), {}
+    headers = data[:header_end].decode('utf-8-sig', errors='replace').rstrip('\r').split(';')
+    if "Date" not in headers or "Time" not in headers:
+        raise ValueError(f"{path} has no Date/Time columns")
+    body = data[header_end + 1:]
+    if body and not body.endswith(b'\n'):
+        body += b'\n'
+    result = _load_csv_fast(body, headers) if body else None
+    if result is None:
+        result = _load_csv_slow(path, headers)
+    return result
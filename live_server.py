@@ -0,0 +1,387 @@
+"""Live sample fan-out over WebSocket and HTTP on localhost
+
+LiveServer is a storage sink: hand it every sample the acquisition path
+produces and any number of local programs can follow the stream without
+touching the serial port.
+
+    ws://127.0.0.1:8765/stream                   history, then live samples
+    ws://127.0.0.1:8765/stream?history=100       only the newest 100 first
+    ws://127.0.0.1:8765/stream?since=<epoch>     history from that time on
+    http://127.0.0.1:8765/samples?start=<epoch>&end=<epoch>&columns=GPIO4,GPIO5
+    http://127.0.0.1:8765/samples?last=500
+    http://127.0.0.1:8765/status
+
+Every WebSocket message is a JSON text frame
+{"type": "history" | "samples", "samples": [[timestamp, {name: value}], ...]};
+/samples answers {"timestamps": [...], "columns": {name: [value or null]}}.
+
+The server runs its own asyncio loop on a background thread. append() only
+queues the sample; the loop publishes the queue publish_interval times a
+second, encoding each batch once for all clients. The newest history
+samples are kept for late joiners and range queries. Each client has a
+bounded queue of batches; when a client reads too slowly its oldest
+batches are dropped, so it can never hold up acquisition or the other
+clients. Only the standard library is used.
+"""
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
+import struct
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+from metrics import METRICS
+
+# Appended to Sec-WebSocket-Key before hashing, fixed by RFC 6455
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+HTTP_STATUS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    426: 'Upgrade Required', 431: 'Request Header Fields Too Large'
+}
+
+
+def websocket_accept(key):
+    """Sec-WebSocket-Accept answer to a client's Sec-WebSocket-Key"""
+    return base64.b64encode(hashlib.sha1(key.encode('ascii') + WEBSOCKET_GUID).digest()).decode('ascii')
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    """One unmasked, unfragmented server-to-client WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_frame(reader, max_size=1 << 20):
+    """(opcode, payload) of the next client frame; client frames are masked
+
+    :raises ValueError: For a frame larger than max_size
+    """
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', await reader.readexactly(8))[0]
+    if length > max_size:
+        raise ValueError(f"Frame of {length} bytes is too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+def _encode_samples(kind, samples):
+    """JSON message for a batch of (timestamp, values)"""
+    return json.dumps({'type': kind, 'samples': samples}, separators=(',', ':')).encode('utf-8')
+
+
+class _Client:
+    """One WebSocket subscriber and its bounded queue of encoded batches"""
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def offer(self, message):
+        """Queue a batch, dropping the oldest one when the client lags"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            METRICS.count('server_dropped')
+        self.queue.put_nowait(message)
+
+
+class LiveServer:
+    """Storage sink publishing samples to WebSocket and HTTP clients"""
+
+    def __init__(self, host='127.0.0.1', port=8765, history=10000, queue_size=100, publish_interval=0.05):
+        """
+        :param host: Interface to listen on; keep the default to stay local
+        :param port: TCP port, 0 picks a free one (see .port after start())
+        :param history: Newest samples kept for late joiners and /samples
+        :param queue_size: Batches a client may fall behind before losing the oldest
+        :param publish_interval: Seconds between two published batches
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.publish_interval = publish_interval
+        self._history = deque(maxlen=history)  # (timestamp, values), only touched on the loop
+        self._pending = []  # Samples appended since the last publish
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._connections = set()  # Tasks serving a connection
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+
+    # --- Sink interface, called from the acquisition threads ---
+
+    def append(self, timestamp, values):
+        """Queue one sample for publishing; never blocks on clients"""
+        with self._lock:
+            self._pending.append([timestamp, values])
+
+    def flush(self):
+        """Publish what is queued without waiting for the next interval"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish)
+
+    def close(self):
+        """Stop the server and disconnect every client"""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Life cycle ---
+
+    def start(self):
+        """Listen on host:port from a background thread
+
+        :raises OSError: When the port cannot be bound
+        """
+        if self._thread is not None:
+            return
+        self._started.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='live-server', daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+        print(f"📡 Live data on ws://{self.host}:{self.port}/stream and http://{self.host}:{self.port}/samples")
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            self._error = e
+            loop.close()
+            self._started.set()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop = loop
+        loop.create_task(self._publish_loop())
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            # The publisher and any connection still being served
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _shutdown(self):
+        self._publish()
+        self._server.close()
+        # Aborted sockets end the handlers' reads, so they return by themselves;
+        # abort rather than close, a stalled client would keep close() waiting
+        for client in list(self._clients):
+            client.writer.transport.abort()
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=1)
+        await self._server.wait_closed()
+
+    # --- Publishing, on the loop thread ---
+
+    async def _publish_loop(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            self._publish()
+
+    def _publish(self):
+        """Move queued samples into the history and send them to every client"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self._history.extend(batch)
+        METRICS.count('server_published', len(batch))
+        if not self._clients:
+            return
+        message = encode_frame(_encode_samples('samples', batch))
+        for client in self._clients:
+            client.offer(message)
+
+    def _select(self, start=None, end=None, last=None):
+        """History samples with start <= timestamp <= end, or the newest last ones"""
+        samples = list(self._history)
+        if last is not None:
+            return samples[-last:] if last > 0 else []
+        first = 0 if start is None else bisect.bisect_left(samples, start, key=lambda sample: sample[0])
+        stop = len(samples) if end is None else bisect.bisect_right(samples, end, key=lambda sample: sample[0])
+        return samples[first:stop]
+
+    # --- Connections ---
+
+    async def _handle(self, reader, writer):
+        """Serve one connection: a WebSocket subscription or one HTTP request"""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except asyncio.LimitOverrunError:
+                await self._respond(writer, 431, {'error': "Request headers too large"})
+                return
+            lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, _ = lines[0].split(' ', 2)
+            except ValueError:
+                await self._respond(writer, 400, {'error': "Malformed request line"})
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            if method != 'GET':
+                await self._respond(writer, 405, {'error': f"{method} is not supported"})
+            elif url.path == '/stream':
+                await self._subscribe(reader, writer, headers, query)
+            elif url.path == '/samples':
+                await self._samples(writer, query)
+            elif url.path == '/status':
+                await self._respond(writer, 200, self._status())
+            else:
+                await self._respond(writer, 404, {'error': f"Unknown path {url.path}"})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def _respond(self, writer, status, body):
+        """Send a JSON HTTP response"""
+        payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        writer.write((
+            f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Access-Control-Allow-Origin: *\r\n"
+            f"Connection: close\r\n\r\n"
+        ).encode('ascii') + payload)
+        await writer.drain()
+
+    def _status(self):
+        """Body of /status"""
+        columns = set()
+        for _, values in self._history:
+            columns.update(values)
+        return {
+            'clients': len(self._clients),
+            'samples': len(self._history),
+            'first': self._history[0][0] if self._history else None,
+            'last': self._history[-1][0] if self._history else None,
+            'columns': sorted(columns),
+            'published': METRICS.counter('server_published'),
+            'dropped': METRICS.counter('server_dropped'),
+        }
+
+    async def _samples(self, writer, query):
+        """Range query over the history buffer"""
+        try:
+            start = float(query['start']) if 'start' in query else None
+            end = float(query['end']) if 'end' in query else None
+            last = int(query['last']) if 'last' in query else None
+        except ValueError as e:
+            await self._respond(writer, 400, {'error': f"Bad query: {e}"})
+            return
+        samples = self._select(start, end, last)
+        if 'columns' in query:
+            names = [name for name in query['columns'].split(',') if name]
+        else:
+            names = sorted({name for _, values in samples for name in values})
+        await self._respond(writer, 200, {
+            'timestamps': [timestamp for timestamp, _ in samples],
+            'columns': {name: [values.get(name) for _, values in samples] for name in names},
+        })
+
+    async def _subscribe(self, reader, writer, headers, query):
+        """Upgrade to a WebSocket, send the history, then follow live samples"""
+        key = headers.get('sec-websocket-key')
+        if headers.get('upgrade', '').lower() != 'websocket' or not key:
+            await self._respond(writer, 426, {'error': "Connect with a WebSocket client"})
+            return
+        try:
+            since = float(query['since']) if 'since' in query else None
+            last = int(query['history']) if 'history' in query else None
+        except ValueError as e:
+            await self._respond(writer, 400, {'error': f"Bad query: {e}"})
+            return
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n"
+        ).encode('ascii'))
+
+        # Registered in the same loop step as the history is taken, so no
+        # sample is missed or sent twice between the two
+        client = _Client(writer, self.queue_size)
+        client.offer(encode_frame(_encode_samples('history', self._select(since, None, last))))
+        self._clients.add(client)
+        METRICS.set('server_clients', len(self._clients))
+        sender = asyncio.ensure_future(self._send(client))
+        try:
+            await self._receive(reader, writer)
+        finally:
+            sender.cancel()
+            self._clients.discard(client)
+            METRICS.set('server_clients', len(self._clients))
+
+    async def _send(self, client):
+        """Write queued batches to the client as fast as it reads them"""
+        try:
+            while True:
+                client.writer.write(await client.queue.get())
+                await client.writer.drain()
+        except ConnectionError:
+            client.writer.close()
+
+    async def _receive(self, reader, writer):
+        """Answer pings and the closing handshake; other client messages are ignored"""
+        while True:
+            try:
+                opcode, payload = await read_frame(reader)
+            except ValueError:
+                return
+            if opcode == OP_CLOSE:
+                writer.write(encode_frame(payload[:2], OP_CLOSE))
+                await writer.drain()
+                return
+            if opcode == OP_PING:
+                writer.write(encode_frame(payload, OP_PONG))
@@ -0,0 +1,178 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of one time series
+
+    Level 0 holds the raw samples. Every level above it holds one bucket
+    (first time, last time, min, max) per `factor` entries of the level below
+    and is extended as samples arrive. A query picks the finest level that
+    yields at most the requested number of buckets, so drawing costs
+    O(pixels) however long the recording is. Timestamps must not decrease.
+
+    With max_entries set, each level keeps only its newest entries, which
+    bounds memory for endless runs; older stretches are then drawn from the
+    finest level that still covers them. The coarsest level is never trimmed.
+    """
+
+    def __init__(self, factor=8, max_entries=None):
+        """
+        :param factor: Entries of a level summarised by one bucket of the next
+        :param max_entries: Entries kept per level, None = keep everything
+        """
+        if max_entries is not None and max_entries < 2 * factor:
+            raise ValueError("max_entries must be at least 2 * factor")
+        self.factor = factor
+        self.max_entries = max_entries
+        self.count = 0  # Samples appended, including trimmed ones
+        self.times = array('d')
+        self.values = array('d')
+        self.raw_offset = 0  # Sample number of times[0]
+        # Per level: [first times, last times, mins, maxs]
+        self.levels = []
+        self.level_offsets = []  # Bucket number of each level's first entry
+
+    def __len__(self):
+        return self.count
+
+    def first_time(self):
+        """Timestamp of the first sample ever appended"""
+        if self.levels:
+            return self.levels[-1][0][0]
+        return self.times[0]
+
+    def clear(self):
+        """Drop all samples"""
+        self.count = 0
+        self.times = array('d')
+        self.values = array('d')
+        self.raw_offset = 0
+        self.levels = []
+        self.level_offsets = []
+
+    def append(self, timestamp, value):
+        """Add one sample and update the coarser levels that just filled up"""
+        if self.times and timestamp < self.times[-1]:
+            timestamp = self.times[-1]
+        self.times.append(timestamp)
+        self.values.append(value)
+        self.count += 1
+
+        count = self.count
+        level = 0
+        while count % self.factor == 0:
+            self._build_bucket(level)
+            count //= self.factor
+            level += 1
+        if self.max_entries is not None:
+            self._trim()
+
+    def _build_bucket(self, level):
+        """Summarise the last `factor` entries of `level` into level + 1"""
+        f = self.factor
+        if level == len(self.levels):
+            self.levels.append([array('d'), array('d'), array('d'), array('d')])
+            self.level_offsets.append(0)
+        target = self.levels[level]
+        if level == 0:
+            window = self.values[-f:]
+            target[0].append(self.times[-f])
+            target[1].append(self.times[-1])
+            target[2].append(min(window))
+            target[3].append(max(window))
+        else:
+            source = self.levels[level - 1]
+            target[0].append(source[0][-f])
+            target[1].append(source[1][-1])
+            target[2].append(min(source[2][-f:]))
+            target[3].append(max(source[3][-f:]))
+
+    def _trim(self):
+        """Drop the oldest entries of levels that outgrew max_entries"""
+        # Trim in steps of a quarter, so the memmove is amortised
+        step = self.max_entries // 4
+        if len(self.times) > self.max_entries + step:
+            del self.times[:step]
+            del self.values[:step]
+            self.raw_offset += step
+        for number, level in enumerate(self.levels[:-1]):
+            if len(level[0]) > self.max_entries + step:
+                for column in level:
+                    del column[:step]
+                self.level_offsets[number] += step
+
+    def _coverage(self, level):
+        """First sample number still summarised at `level`"""
+        if level == 0:
+            return self.raw_offset
+        return self.level_offsets[level - 1] * self.factor ** level
+
+    def _locate(self, timestamp, left):
+        """Sample number where `timestamp` falls, at the finest level covering it"""
+        for level in range(len(self.levels) + 1):
+            if level == 0:
+                starts = ends = self.times
+                offset = self.raw_offset
+            else:
+                starts, ends = self.levels[level - 1][:2]
+                offset = self.level_offsets[level - 1]
+            if level < len(self.levels) and offset and timestamp < starts[0]:
+                continue  # Already trimmed here, look at a coarser level
+            index = bisect_left(ends, timestamp) if left else bisect_right(starts, timestamp)
+            return min((offset + index) * self.factor ** level, self.count)
+        return 0
+
+    def query(self, start, end, max_points):
+        """Buckets covering [start, end], at most about max_points of them
+
+        :return: List of (first time, last time, min, max)
+        """
+        if not self.count:
+            return []
+        first = self._locate(start, left=True)
+        last = self._locate(end, left=False)
+        if first >= last:
+            return []
+        level = 0
+        size = 1
+        while level < len(self.levels) and ((last - first) // size > max_points or first < self._coverage(level)):
+            level += 1
+            size *= self.factor
+        result = []
+        self._collect(level, size, first, last, result)
+        return result
+
+    def _collect(self, level, size, first, last, result):
+        """Append buckets of `level` covering raw samples [first, last)"""
+        first = max(first, self._coverage(level))
+        if first >= last:
+            return
+        if level == 0:
+            times = self.times
+            values = self.values
+            offset = self.raw_offset
+            for i in range(first - offset, last - offset):
+                result.append((times[i], times[i], values[i], values[i]))
+            return
+
+        offset = self.level_offsets[level - 1]
+        built = offset + len(self.levels[level - 1][0])
+        lower_size = size // self.factor
+        if first < self._coverage(level - 1):
+            # The level below no longer has the start, use the whole bucket
+            bucket_first = first // size
+        else:
+            bucket_first = -(-first // size)  # Ceiling division
+        bucket_last = min(last // size, built)
+        if bucket_first >= bucket_last:
+            self._collect(level - 1, lower_size, first, last, result)
+            return
+
+        # Partial bucket before the aligned range
+        self._collect(level - 1, lower_size, first, bucket_first * size, result)
+        starts, ends, mins, maxs = self.levels[level - 1]
+        for b in range(bucket_first - offset, bucket_last - offset):
+            result.append((starts[b], ends[b], mins[b], maxs[b]))
+        # Partial bucket (or not yet summarised samples) after it
+        self._collect(level - 1, lower_size, bucket_last * size, last, result)
@@ -1,29 +1,154 @@
+import os
 import sys
-import csv
+import time
+import argparse
+import lzma
+import sqlite3
+import threading
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QHBoxLayout, QVBoxLayout, QTableWidget, QLabel,
-    QLineEdit, QPushButton, QTableWidgetItem, QMessageBox, QHeaderView
+    QApplication, QWidget, QHBoxLayout, QVBoxLayout, QTableView, QLabel,
+    QLineEdit, QPushButton, QMessageBox, QHeaderView, QSplitter, QCheckBox,
+    QFileDialog, QProgressDialog
 )
-from PyQt6.QtCore import Qt
-from datetime import datetime, timedelta
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from device_pool import DevicePool
+from data_model import SensorTableModel
+from csv_index import PagedCsvFile
+from recording_format import RecordingReader
+from plot_widget import LivePlotWidget
+from column_sizer import ColumnWidthTracker
+from sample_journal import SampleJournal, replay
+from sample_store import SampleStore
+from export_worker import EXPORT_FORMATS, ExportWorker
+import archive
+from sampling_scheduler import parse_interval
+from metrics import METRICS, MetricsExporter
 from timer_manager import TimerManager
-from esp32_manager import ESP32Manager
+
+# Table and chart refreshes per second; samples arriving in between are applied together
+DISPLAY_RATE = 20
+
+# Statistics need NumPy, which takes longer to import than the window takes
+# to show; MyApp.load_statistics imports them after the first paint
+gpio_stats = None
+StatsDialog = None
 
 class MyApp(QWidget):
-    def __init__(self):
-        """Initialize the main application window"""
+    journal_replayed = pyqtSignal(object)  # replay() result, from the recovery thread
+
+    def __init__(self, ports=(None,), database_file=None, archive_dir=None,
+                 archive_period='hour', compression='gzip', serve_port=None):
+        """Initialize the main application window
+
+        :param ports: Serial ports of the ESP32 boards to read; None searches
+                      all ports for a board
+        :param database_file: SQLite database that also receives every sample,
+                              or None to keep only the journal
+        :param archive_dir: Folder for hourly/daily compressed CSV archives, or None
+        :param archive_period: 'hour' or 'day'
+        :param compression: 'gzip', 'xz' or 'zstd'
+        :param serve_port: Publish live samples to WebSocket/HTTP clients on
+                           this localhost port, or None
+        """
         super().__init__()
         self.data_file = 'data_file.csv'
         self.datas_file = 'datas.csv'
-        self.data_timer = None
+        self.journal_file = 'session.journal'
+        self.metrics_file = 'metrics.prom'  # Prometheus text; a .json name exports JSON
         self.interval_seconds = 0  # Store interval for later use
         self.gpio_columns = set()  # Track used GPIO columns
-
-        # Initialize ESP32 manager
-        self.esp32 = ESP32Manager(port='COM4', baud_rate=115200)
-
+        self.rolling = None  # gpio_stats.RollingStats once statistics are loaded
+        self.stats_dialog = None
+        self.metrics_dialog = None
+        self.export_worker = None
+        self.export_progress = None
+
+        # Every sample is journaled as it arrives so a crash loses at most one batch.
+        # A journal still there was left by a session that ended early; it is
+        # moved aside and this session starts a fresh one. Every journal moved
+        # aside gets recovered once the window is up, and is kept until a Save
+        # or Clear takes care of its samples.
+        self.journal = SampleJournal(self.journal_file)
+        self.journal.rotate()
+        self._recovery_files = self.journal.previous()
+        self._recovered_files = []  # Journals whose samples are in the table
+        self._saving_recovered = []  # The same, for the save in progress
+        self._recovering = bool(self._recovery_files)  # Live samples wait in the display buffer meanwhile
+        self._painted = False
+        sinks = [self.journal]
+        self.database_file = database_file
+        self.store = None
+        if database_file is not None:
+            try:
+                self.store = SampleStore(database_file)
+                sinks.append(self.store)
+            except sqlite3.Error as e:
+                print(f"❌ Cannot open database {database_file}: {e}")
+        self.archive_dir = archive_dir
+        self.archive = None
+        if archive_dir is not None:
+            try:
+                self.archive = archive.ArchiveWriter(archive_dir, archive_period, compression)
+                sinks.append(self.archive)
+            except (OSError, ValueError) as e:
+                print(f"❌ Cannot archive to {archive_dir}: {e}")
+        # Dashboards and loggers follow the stream here instead of opening the port
+        self.live_server = None
+        if serve_port is not None:
+            from live_server import LiveServer  # asyncio is only imported when serving
+            try:
+                self.live_server = LiveServer(port=serve_port)
+                self.live_server.start()
+                sinks.append(self.live_server)
+            except OSError as e:
+                print(f"❌ Cannot serve live data on port {serve_port}: {e}")
+                self.live_server = None
+
+        # One reader thread per board; connecting and serial waits never block the UI.
+        # Samples reach the table through the display buffer, DISPLAY_RATE times a second.
+        self.devices = DevicePool(list(ports), baud_rate=115200, sinks=sinks)
+        self.display_timer = TimerManager(1000 // DISPLAY_RATE, self.refresh_display)
+        self.devices.no_data.connect(self.on_no_data)
+        self.devices.connection_changed.connect(self.on_connection_changed)
+
+        self.journal_replayed.connect(self.on_journal_replayed)
+
+        # Stage timings and error counters land in metrics_file every 10 s
+        self.metrics_exporter = MetricsExporter(METRICS, self.metrics_file)
+        self.metrics_exporter.start()
+
+        # Only the empty window is built here; history, journal recovery and
+        # statistics are loaded by load_deferred after the first paint
         self.initUI()
+        self.display_timer.start()
+
+    def paintEvent(self, event):
+        """Schedule the deferred loading once the window has been painted"""
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            QTimer.singleShot(0, self.load_deferred)
+
+    def load_deferred(self):
+        """Second half of the start, run after the first paint"""
+        started = time.perf_counter()
+        self.recover_journal()
         self.load_csv_data(self.data_file)
+        self.load_statistics()
+        METRICS.observe('deferred_load', time.perf_counter() - started)
+
+    def load_statistics(self):
+        """Import the NumPy statistics and enable the Statistics button"""
+        global gpio_stats, StatsDialog
+        if gpio_stats is None:
+            try:
+                import gpio_stats
+                from stats_dialog import StatsDialog
+            except ImportError:
+                print("⚠️  NumPy is not installed, statistics are disabled")
+                return
+        self.rolling = gpio_stats.RollingStats(window=100)
+        self.stats_btn.setEnabled(True)
 
     def initUI(self):
         """Setup the user interface"""
@@ -32,13 +157,21 @@ class MyApp(QWidget):
 
         # Left part - data table
         left_layout = QVBoxLayout()
-        self.table = QTableWidget()
+        self.model = SensorTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.setup_table()
         left_label = QLabel("Полученные данные")
         left_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         left_label.setStyleSheet("font-weight: bold; font-size: 14pt;")
         left_layout.addWidget(left_label)
-        left_layout.addWidget(self.table)
+
+        # Table on top, live chart below
+        self.plot = LivePlotWidget()
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.plot)
+        left_layout.addWidget(splitter)
 
         # Right part - control panel
         right_layout = QVBoxLayout()
@@ -52,7 +185,7 @@ class MyApp(QWidget):
         time_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
 
         self.time_edit = QLineEdit()
-        self.time_edit.setPlaceholderText("hh:mm:ss")
+        self.time_edit.setPlaceholderText("hh:mm:ss[.fff]")
         self.time_edit.setStyleSheet("""
             border: 1px solid gray;
             padding: 5px;
@@ -64,26 +197,20 @@ class MyApp(QWidget):
         step_group.addWidget(self.time_edit)
 
         # Button styling
-        button_style = """
+        self.button_style = button_style = """
             border: 1px solid black;
             padding: 12px 18px;
             font-size: 12pt;
             min-width: 120px;
         """
 
-        apply_btn = QPushButton("Применить")
-        apply_btn.setStyleSheet(f"""
-            {button_style}
-            background-color: {'#4CAF50' if self.esp32.is_connected() else 'red'};
-            color: white;
-        """)
+        self.apply_btn = apply_btn = QPushButton("Применить")
+        self.start_btn = start_btn = QPushButton("Старт")
+        self.update_connection_colors()
 
-        start_btn = QPushButton("Старт")
-        start_btn.setStyleSheet(f"""
-            {button_style}
-            background-color: {'green' if self.esp32.is_connected() else '#cccccc'};
-            color: white;
-        """)
+        # Streaming: the board pushes samples itself instead of one frame per tick
+        self.stream_check = QCheckBox("Потоковый режим")
+        self.stream_check.setStyleSheet("font-size: 12pt;")
 
         stop_btn = QPushButton("Стоп")
         stop_btn.setStyleSheet(button_style)
@@ -91,15 +218,34 @@ class MyApp(QWidget):
         save_btn.setStyleSheet(button_style)
         clear_btn = QPushButton("Очистить")
         clear_btn.setStyleSheet(button_style)
+        self.stats_btn = stats_btn = QPushButton("Статистика")
+        stats_btn.setStyleSheet(button_style)
+        stats_btn.setEnabled(False)  # Until load_statistics
+        metrics_btn = QPushButton("Метрики")
+        metrics_btn.setStyleSheet(button_style)
+        database_btn = QPushButton("Из базы")
+        database_btn.setStyleSheet(button_style)
+        database_btn.setEnabled(self.store is not None)  # Only with --db
+        archive_btn = QPushButton("Из архива")
+        archive_btn.setStyleSheet(button_style)
+        archive_btn.setEnabled(self.archive_dir is not None)  # Only with --archive
+        recording_btn = QPushButton("Из записи")
+        recording_btn.setStyleSheet(button_style)
 
         # Add elements to layout
         right_layout.addLayout(step_group)
         right_layout.addWidget(apply_btn)
+        right_layout.addWidget(self.stream_check)
         right_layout.addWidget(start_btn)
         right_layout.addSpacing(20)
         right_layout.addWidget(stop_btn)
         right_layout.addWidget(save_btn)
         right_layout.addWidget(clear_btn)
+        right_layout.addWidget(stats_btn)
+        right_layout.addWidget(metrics_btn)
+        right_layout.addWidget(database_btn)
+        right_layout.addWidget(archive_btn)
+        right_layout.addWidget(recording_btn)
 
         # Connect signals
         apply_btn.clicked.connect(self.apply_clicked)
@@ -107,6 +253,11 @@ class MyApp(QWidget):
         stop_btn.clicked.connect(self.stop_clicked)
         save_btn.clicked.connect(self.save_clicked)
         clear_btn.clicked.connect(self.clear_clicked)
+        stats_btn.clicked.connect(self.stats_clicked)
+        metrics_btn.clicked.connect(self.metrics_clicked)
+        database_btn.clicked.connect(self.database_clicked)
+        archive_btn.clicked.connect(self.archive_clicked)
+        recording_btn.clicked.connect(self.recording_clicked)
 
         main_layout.addLayout(left_layout)
         main_layout.addLayout(right_layout)
@@ -116,20 +267,39 @@ class MyApp(QWidget):
         self.setGeometry(100, 100, 1000, 600)
         self.show()
 
+    def update_connection_colors(self):
+        """Color the Apply/Start buttons by the current connection state"""
+        connected = self.devices.is_connected()
+        self.apply_btn.setStyleSheet(f"""
+            {self.button_style}
+            background-color: {'#4CAF50' if connected else 'red'};
+            color: white;
+        """)
+        self.start_btn.setStyleSheet(f"""
+            {self.button_style}
+            background-color: {'green' if connected else '#cccccc'};
+            color: white;
+        """)
+
+    def on_connection_changed(self, device_id, connected):
+        """React to a board connecting or dropping off"""
+        print(f"{'✅' if connected else '❌'} ESP32 {device_id} {'connected' if connected else 'disconnected'}")
+        self.update_connection_colors()
+
     def setup_table(self):
         """Configure the data table appearance"""
         self.table.setStyleSheet("""
-            QTableWidget{
+            QTableView{
                 border: 2px solid black;
                 gridline-color: black;
                 background-color: #f5f5f5;
             }
-            QTableWidget::item{
+            QTableView::item{
                 border-bottom: 1px solid #ccc;
                 border-right: 1px solid #ccc;
                 padding: 5px;
             }
-            QTableWidget::item:selected{
+            QTableView::item:selected{
                 background-color: #e0f0ff;
                 color: black;
             }
@@ -140,76 +310,157 @@ class MyApp(QWidget):
                 font-weight: bold;
             }
         """)
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.verticalHeader().setVisible(False)
+        # Fixed row height keeps scrolling O(visible rows) for huge tables
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
 
-        # Initialize basic columns
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["Date", "Time"])
+        # Columns widen only when a new widest value shows up
+        self.column_sizer = ColumnWidthTracker(self.table)
 
     def load_csv_data(self, filename='data_file.csv'):
-        """Load data from CSV file with ';' delimiter"""
+        """Load data from CSV file with ';' delimiter
+
+        The file is indexed in the background and rows are read page by page
+        as they are scrolled into view. Compressed files (.gz, .xz, .zst) are
+        decompressed as a stream into the table instead.
+        """
+        if archive.is_compressed(filename):
+            self.load_archive_file(filename)
+            return
         try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file, delimiter=';')
-                data = list(reader)
-                if data:
-                    headers = data[0]
-                    rows = data[1:]
-
-                    # Check if GPIO columns exist in headers
-                    for header in headers:
-                        if header.startswith("GPIO"):
-                            self.gpio_columns.add(header)
-
-                    # Update table headers if GPIO columns found
-                    if self.gpio_columns:
-                        self.update_table_headers()
-
-                    self.table.setColumnCount(len(headers))
-                    self.table.setHorizontalHeaderLabels(headers)
-                    self.table.setRowCount(len(rows))
-
-                    for i, row in enumerate(rows):
-                        for j, item in enumerate(row):
-                            self.table.setItem(i, j, QTableWidgetItem(item))
-
-                    self.table.resizeColumnsToContents()
-                    self.table.resizeRowsToContents()
+            history = PagedCsvFile(filename)
+            if history.headers:
+                # Check if GPIO columns exist in headers
+                for header in history.headers:
+                    if header.startswith("GPIO"):
+                        self.gpio_columns.add(header)
+
+                self.model.attach_history(history)
+                history.start_indexing()
+            else:
+                history.close()
         except FileNotFoundError:
             print(f"File {filename} not found")
         except Exception as e:
             print(f"Error reading file: {e}")
 
-    def save_data_to_file(self, filename=None):
-        """Save data to CSV file"""
-        if filename is None:
-            filename = self.datas_file
+    def recover_journal(self):
+        """Replay samples journaled by a previous session that ended early
+
+        The journals moved aside are read on a background thread;
+        on_journal_replayed adds the samples. Live samples wait in the display
+        buffer meanwhile, so the table stays in time order.
+        """
+        if not self._recovering:
+            return
+        thread = threading.Thread(
+            target=self._replay_journal,
+            args=self._recovery_files,
+            name='journal-replay',
+            daemon=True
+        )
+        thread.start()
+
+    def _replay_journal(self, *paths):
+        """Recovery thread body; always reports a result, empty if a journal is unreadable"""
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file, delimiter=';')
-                headers = [self.table.horizontalHeaderItem(i).text() for i in range(self.table.columnCount())]
-                writer.writerow(headers)
-                for i in range(self.table.rowCount()):
-                    row = [self.table.item(i, j).text() if self.table.item(i, j) else '' for j in range(self.table.columnCount())]
-                    writer.writerow(row)
+            result = replay(*paths)
         except Exception as e:
-            print(f"Error saving file: {e}")
+            print(f"❌ Error recovering {', '.join(paths)}: {e}")
+            result = ([], [], [])
+        self.journal_replayed.emit(result)
+
+    def on_journal_replayed(self, result):
+        """Add the replayed samples, then the live ones that waited for them"""
+        if not self._recovering:
+            return  # Cleared in the meantime
+        self._recovering = False
+        self._recovered_files = self._recovery_files
+        columns, timestamps, values = result
+        if timestamps:
+            self.add_recovered(columns, timestamps, values)
+        self.refresh_display()
+
+    def add_recovered(self, columns, timestamps, values):
+        """Show samples replayed from the journal"""
+        self._append_loaded(timestamps, dict(zip(columns, values)))
+        print(f"♻️  Recovered {len(timestamps)} samples from {', '.join(self._recovery_files)}")
+
+    def load_recording(self, filename, start=None, end=None):
+        """Append samples from a .wrec recording, optionally only [start, end]"""
+        try:
+            with RecordingReader(filename) as reader:
+                timestamps, columns = reader.read(start, end)
+        except FileNotFoundError:
+            print(f"File {filename} not found")
+            return
+        except (OSError, ValueError) as e:
+            print(f"Error reading file: {e}")
+            return
+        self._append_loaded(timestamps, columns)
+        print(f"💾 Loaded {len(timestamps)} samples from {filename}")
+
+    def load_archive_file(self, filename, start=None, end=None):
+        """Append samples from a plain or compressed CSV, optionally only [start, end]"""
+        try:
+            timestamps, columns = archive.read_file(filename, start, end)
+        except FileNotFoundError:
+            print(f"File {filename} not found")
+            return
+        except (OSError, EOFError, RuntimeError, lzma.LZMAError) as e:
+            print(f"Error reading file: {e}")
+            return
+        self._append_loaded(timestamps, columns)
+
+    def load_archives(self, start=None, end=None):
+        """Append samples from the archives overlapping [start, end]; no other archive is opened"""
+        if self.archive_dir is None:
+            print("Archiving is not enabled")
+            return
+        try:
+            timestamps, columns = archive.read_range(self.archive_dir, start, end)
+        except (OSError, EOFError, RuntimeError, lzma.LZMAError) as e:
+            print(f"Error reading archives: {e}")
+            return
+        self._append_loaded(timestamps, columns)
+        print(f"🗜️ Loaded {len(timestamps)} samples from {self.archive_dir}")
+
+    def _append_loaded(self, timestamps, columns):
+        """Add bulk-loaded samples to the table and the chart"""
+        for name in columns:
+            if name.startswith("GPIO"):
+                self.gpio_columns.add(name)
+        self.model.append_columns(timestamps, columns)
+        self.plot.add_samples(timestamps, columns)
+
+    def load_database(self, start=None, end=None, columns=None):
+        """Append samples from the SQLite database, optionally only [start, end]
+
+        :param columns: Column names to load, all when None
+        """
+        if self.store is None:
+            print("Database is not enabled")
+            return
+        try:
+            timestamps, columns = self.store.query(start, end, columns)
+        except sqlite3.Error as e:
+            print(f"Error reading database: {e}")
+            return
+        self._append_loaded(timestamps, columns)
+        print(f"💾 Loaded {len(timestamps)} samples from {self.database_file}")
 
     def apply_clicked(self):
         """Handle 'Apply' button click - set the time interval"""
         try:
             time_str = self.time_edit.text().strip()
-            if not time_str:
-                raise ValueError("Time input field is empty")
-            t = datetime.strptime(time_str, "%H:%M:%S")
-            self.interval_seconds = timedelta(hours=t.hour, minutes=t.minute, seconds=t.second).total_seconds()
+            # Fractions of a second are allowed, e.g. 00:00:00.010 for 100 Hz
+            self.interval_seconds = parse_interval(time_str)
 
             # Clear time input error style
             self.time_edit.setStyleSheet(self.time_edit.styleSheet().replace("border: 2px solid red;", ""))
 
             # Check ESP32 connection
-            if not self.esp32.is_connected():
+            if not self.devices.is_connected():
                 QMessageBox.warning(self, "Error", "No connection to ESP32. Check device connection.")
                 return
 
@@ -228,98 +479,261 @@ class MyApp(QWidget):
             return
 
         # Check ESP32 connection
-        if not self.esp32.is_connected():
-            if not self.esp32.connect():
-                QMessageBox.warning(self, "Error", "Failed to connect to ESP32")
-                return
-
-        # Stop previous timer if exists
-        if self.data_timer:
-            self.data_timer.stop()
-            self.data_timer = None
+        if not self.devices.is_connected():
+            # Connection happens in the background; just hurry the next attempt
+            self.devices.reconnect_now()
+            QMessageBox.warning(self, "Error", "No connection to ESP32 yet. Retrying in background.")
+            return
 
-        # Create and start new timer for ESP32 data requests
-        self.data_timer = TimerManager(
-            interval_ms=int(self.interval_seconds * 1000),
-            callback=self.request_sensor_data
-        )
-        self.data_timer.start()
+        # (Re)start background acquisition with the current interval
+        self.devices.start_acquisition(self.interval_seconds, streaming=self.stream_check.isChecked())
 
         QMessageBox.information(self, "Start", f"Data collection started. Interval: {self.interval_seconds} seconds")
 
-    def request_sensor_data(self):
-        """Request data from ESP32 and add to table"""
-        sensor_data = self.esp32.read_sensor_data()
-
-        if sensor_data is not None:
-            # Update GPIO columns list
-            new_columns = False
-            for gpio in sensor_data.keys():
+    def refresh_display(self):
+        """Apply the samples the device pool delivered since the last refresh"""
+        if self._recovering:
+            return
+        samples = self.devices.display.drain()
+        if samples:
+            self.add_samples(samples)
+
+    def add_samples(self, samples):
+        """Add a batch of (timestamp, values) samples to the table and chart"""
+        # Update GPIO columns list
+        new_columns = False
+        for _, sensor_data in samples:
+            for gpio in sensor_data:
                 if gpio not in self.gpio_columns:
                     self.gpio_columns.add(gpio)
                     new_columns = True
 
-            # Update headers if new columns added
-            if new_columns:
+        # Update headers if new columns added
+        if new_columns:
+            with METRICS.timed('update_table_headers'):
                 self.update_table_headers()
 
-            # Add data to table
-            self.add_data_to_table(sensor_data)
-            print(f"✅ Data added: {sensor_data}")
+        # One row insertion and one repaint for the whole batch
+        with METRICS.timed('add_data_to_table'):
+            self.model.append_samples(samples)
+            self.plot.add_rows(samples)
+        # From the frame's arrival to the table, including the reorder window and refresh wait
+        now = time.time()
+        for timestamp, sensor_data in samples:
+            METRICS.observe('sample_age', now - timestamp)
+            if self.rolling is not None:
+                self.rolling.update(sensor_data)
+        METRICS.count('display_batches')
+        if len(samples) == 1:
+            print(f"✅ Data added: {samples[0][1]}")
         else:
-            print("⚠️  No data received from ESP32")
+            print(f"✅ Data added: {len(samples)} samples, last {samples[-1][1]}")
+
+    def on_no_data(self, device_id):
+        """Report a missed frame from one of the boards"""
+        print(f"⚠️  No data received from ESP32 {device_id}")
 
     def update_table_headers(self):
         """Update table headers with new GPIO columns"""
-        headers = ["Date", "Time"] + sorted(list(self.gpio_columns))
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
-
-    def add_data_to_table(self, sensor_data):
-        """Add a data row to the table"""
-        # Get current date and time
-        now = datetime.now()
-        date_str = now.strftime("%d.%m.%Y")
-        time_str = now.strftime("%H:%M:%S")
-
-        # Format data row
-        data_row = [date_str, time_str]
-        for gpio in sorted(self.gpio_columns):
-            data_row.append(sensor_data.get(gpio, ""))
-
-        # Add data to table
-        row_position = self.table.rowCount()
-        self.table.insertRow(row_position)
-
-        for col, item in enumerate(data_row):
-            self.table.setItem(row_position, col, QTableWidgetItem(str(item)))
-
-        self.table.resizeColumnsToContents()
+        self.model.set_value_columns(self.gpio_columns)
 
     def stop_clicked(self):
-        """Stop timer and display message"""
-        if self.data_timer:
-            self.data_timer.stop()
-            self.data_timer = None
+        """Stop acquisition and display message"""
+        self.devices.stop_acquisition()
         QMessageBox.information(self, "Completion", "Data collection stopped")
 
     def save_clicked(self):
-        """Save data to file"""
-        self.save_data_to_file()
-        QMessageBox.information(self, "Save", "Data successfully saved")
+        """Ask for a file and save the table to it in the background"""
+        filename, selected = QFileDialog.getSaveFileName(
+            self, "Сохранить", self.datas_file, ";;".join(label for label, _ in EXPORT_FORMATS)
+        )
+        if not filename:
+            return
+        extension = dict(EXPORT_FORMATS).get(selected, '.csv')
+        if not any(filename.endswith(ext) for _, ext in EXPORT_FORMATS):
+            filename += extension
+        # The table is what gets saved, and it misses what the display buffer dropped
+        dropped = self.devices.display.dropped
+        if dropped:
+            storage = self.database_file or self.archive_dir or self.journal_file
+            answer = QMessageBox.question(
+                self, "Save",
+                f"{dropped} samples were dropped from the table while it could not keep up "
+                f"and will be missing from {os.path.basename(filename)}. "
+                f"All samples were stored in {storage}.\n\nSave anyway?"
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        self.export_data(filename)
+
+    def export_data(self, filename):
+        """Write a snapshot of the table to filename (.csv, .csv.gz or .wrec) in a worker thread
+
+        Acquisition and the table keep running; the result is reported when
+        the worker finishes.
+        """
+        if self.export_worker is not None:
+            QMessageBox.warning(self, "Save", "A save is already in progress")
+            return
+        snapshot = self.model.snapshot()
+        self._saving_recovered = self._recovered_files
+        self.export_worker = worker = ExportWorker(snapshot, filename, self)
+        self.export_progress = QProgressDialog(f"Сохранение {os.path.basename(filename)}", "Отмена", 0, max(len(snapshot), 1), self)
+        self.export_progress.setMinimumDuration(500)
+        self.export_progress.canceled.connect(worker.requestInterruption)
+        worker.progress.connect(self.on_export_progress)
+        worker.succeeded.connect(self.on_export_succeeded)
+        worker.failed.connect(self.on_export_failed)
+        worker.cancelled.connect(self.on_export_cancelled)
+        worker.finished.connect(self.on_export_finished)
+        worker.start()
+
+    def on_export_progress(self, written, total):
+        """Move the progress bar"""
+        if self.export_progress is not None:
+            self.export_progress.setValue(min(written, self.export_progress.maximum()))
+
+    def on_export_succeeded(self, filename, rows):
+        """Report a completed save"""
+        self.on_export_finished()
+        # Recovered samples are in the saved file now, their journals can go
+        self.journal.discard_previous(self._saving_recovered)
+        self._recovered_files = [path for path in self._recovered_files if path not in self._saving_recovered]
+        QMessageBox.information(self, "Save", f"Data successfully saved to {filename} ({rows} rows)")
+
+    def on_export_failed(self, message):
+        """Report a failed save"""
+        self.on_export_finished()
+        QMessageBox.warning(self, "Save", f"Data could not be saved: {message}")
+
+    def on_export_cancelled(self):
+        """Report a cancelled save"""
+        self.on_export_finished()
+        QMessageBox.information(self, "Save", "Saving cancelled, no file was written")
+
+    def on_export_finished(self):
+        """Close the progress dialog and forget the worker"""
+        if self.export_progress is not None:
+            self.export_progress.close()
+            self.export_progress = None
+        if self.export_worker is not None:
+            self.export_worker.wait()
+            self.export_worker.deleteLater()
+            self.export_worker = None
+
+    def stats_clicked(self):
+        """Open the statistics window"""
+        if self.stats_dialog is None:
+            self.stats_dialog = StatsDialog(self.rolling, self.collect_series, self)
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+    def metrics_clicked(self):
+        """Open the pipeline metrics window"""
+        if self.metrics_dialog is None:
+            from metrics_dialog import MetricsDialog
+            self.metrics_dialog = MetricsDialog(METRICS, self.metrics_file, self)
+        self.metrics_dialog.show()
+        self.metrics_dialog.raise_()
+
+    def database_clicked(self):
+        """Ask for a time range and load its samples from the SQLite database"""
+        from range_dialog import RangeDialog
+        dialog = RangeDialog("Загрузка из базы", self)
+        if dialog.exec():
+            self.load_database(*dialog.time_range())
+
+    def archive_clicked(self):
+        """Ask for a time range and load its samples from the archives"""
+        from range_dialog import RangeDialog
+        dialog = RangeDialog("Загрузка из архива", self)
+        if dialog.exec():
+            self.load_archives(*dialog.time_range())
+
+    def recording_clicked(self):
+        """Ask for a .wrec recording and a time range within it, then load that range"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Открыть запись", "", "Binary recording (*.wrec)")
+        if not filename:
+            return
+        try:
+            with RecordingReader(filename) as reader:
+                span = reader.time_range()
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Open", f"Recording could not be read: {e}")
+            return
+        if span is None:
+            QMessageBox.information(self, "Open", f"{os.path.basename(filename)} holds no samples")
+            return
+        from range_dialog import RangeDialog
+        dialog = RangeDialog("Загрузка из записи", self, span=span)
+        if dialog.exec():
+            self.load_recording(filename, *dialog.time_range())
+
+    def collect_series(self):
+        """History file and live samples as NumPy arrays for gpio_stats"""
+        parts = []
+        history = self.model.history_file()
+        if history is not None:
+            parts.append(gpio_stats.load_csv(history))
+        parts.append(self.model.live_columns())
+        return gpio_stats.concat(parts)
 
     def clear_clicked(self):
         """Clear table data"""
-        if self.data_timer:
-            self.data_timer.stop()
-            self.data_timer = None
-        self.table.setRowCount(0)
+        self.devices.stop_acquisition()
+        self._recovering = False
+        self.devices.display.clear()
+        self.model.clear()
+        self.plot.clear()
+        if self.rolling is not None:
+            self.rolling.clear()
+        self.journal.truncate(previous=True)
+        self._recovered_files = []
         self.gpio_columns = set()
         self.update_table_headers()
         self.time_edit.setStyleSheet(self.time_edit.styleSheet().replace("border: 2px solid red;", ""))
 
+    def closeEvent(self, event):
+        """Shut down the acquisition thread before the window closes"""
+        if self.export_worker is not None:
+            # An unfinished export leaves no partial file behind
+            self.export_worker.requestInterruption()
+            self.export_worker.wait()
+        self.display_timer.stop()
+        self.devices.shutdown()
+        # A clean exit leaves nothing of this session to recover; recovered
+        # journals that were not saved are kept for the next start
+        self.journal.truncate()
+        if self.store is not None:
+            self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.live_server is not None:
+            self.live_server.close()
+        self.model.close()
+        self.metrics_exporter.stop()
+        super().closeEvent(event)
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    ex = MyApp()
+    # Ports can be given on the command line: python main.py COM4 COM5
+    # Without arguments the first port answering the ESP32 protocol is used
+    parser = argparse.ArgumentParser(description="ESP32 GPIO data collection")
+    parser.add_argument('ports', nargs='*', help="Serial ports of the boards")
+    parser.add_argument('--db', default=None, help="Also store samples in this SQLite database")
+    parser.add_argument('--archive', default=None, help="Also archive samples into compressed files in this folder")
+    parser.add_argument('--archive-period', choices=archive.PERIODS, default='hour', help="One archive per hour or day")
+    parser.add_argument('--compression', choices=list(archive.COMPRESSIONS), default='gzip', help="Archive compression")
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help="Publish live samples on ws://127.0.0.1:PORT/stream and http://127.0.0.1:PORT/samples")
+    args = parser.parse_args(app.arguments()[1:])
+    ex = MyApp(
+        ports=args.ports or (None,),
+        database_file=args.db,
+        archive_dir=args.archive,
+        archive_period=args.archive_period,
+        compression=args.compression,
+        serve_port=args.serve
+    )
     sys.exit(app.exec())
\ No newline at end of file
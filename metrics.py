@@ -0,0 +1,222 @@
+"""Counters and latency histograms for the acquisition pipeline
+
+Cheap enough to stay on in production: a timed stage costs two perf_counter()
+calls, a lock and a bisect over a dozen bucket bounds.
+
+    from metrics import METRICS
+    with METRICS.timed('parse'):
+        samples = parser.feed_samples(data)
+    METRICS.count('crc_errors', 2)
+    METRICS.write('metrics.prom')  # Prometheus text format; a .json path writes JSON
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds, from 10 µs to 5 s
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+PREFIX = 'esp32_'
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their count, sum and maximum"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max when above all bounds)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """Summary dict with cumulative bucket counts"""
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            cumulative.append([bound, seen])
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class _Timer:
+    """Context manager recording the time spent inside it"""
+
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+
+class Metrics:
+    """Named counters, gauges and histograms, safe to update from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    def count(self, name, amount=1):
+        """Add to a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set(self, name, value):
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, seconds):
+        """Record one duration in a histogram"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def timed(self, name):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, name)
+
+    def counter(self, name):
+        """Current value of a counter, 0 if never counted"""
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        """Everything as plain dicts, for display or JSON"""
+        with self._lock:
+            return {
+                'started': self.started,
+                'uptime': time.time() - self.started,
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'histograms': {name: h.snapshot() for name, h in self._histograms.items()},
+            }
+
+    def reset(self):
+        """Forget every value"""
+        with self._lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}
+            self.started = time.time()
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {PREFIX}uptime_seconds gauge",
+            f"{PREFIX}uptime_seconds {snapshot['uptime']:.3f}",
+        ]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value}")
+        for name, histogram in sorted(snapshot['histograms'].items()):
+            metric = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in histogram['buckets']:
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {count}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{metric}_sum {histogram['sum']:.9f}")
+            lines.append(f"{metric}_count {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """snapshot() as a JSON document"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def write(self, path):
+        """Replace path atomically; JSON for *.json, Prometheus text otherwise"""
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+
+class MetricsExporter:
+    """Background thread writing a Metrics object to a file every few seconds"""
+
+    def __init__(self, metrics, path, interval=10.0):
+        """
+        :param metrics: Metrics to export
+        :param path: Output file, e.g. for the node_exporter textfile collector
+        :param interval: Seconds between writes
+        """
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start writing"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and write one last time"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.metrics.write(self.path)
+        except OSError as e:
+            print(f"❌ Error writing metrics to {self.path}: {e}")
+
+
+# Shared by every module of the process
+METRICS = Metrics()
@@ -0,0 +1,95 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem
+)
+
+STAGE_COLUMNS = ['count', 'mean', 'p50', 'p99', 'max']
+
+
+def _ms(seconds):
+    """Duration in milliseconds for display"""
+    return f"{seconds * 1000:.3f}"
+
+
+class MetricsDialog(QDialog):
+    """Per-stage timings and pipeline counters from a metrics.Metrics object"""
+
+    def __init__(self, metrics, export_path=None, parent=None):
+        """
+        :param metrics: metrics.Metrics to display
+        :param export_path: File the metrics are exported to, shown for reference
+        """
+        super().__init__(parent)
+        self.metrics = metrics
+        self.setWindowTitle("Метрики")
+        self.resize(600, 500)
+
+        layout = QVBoxLayout()
+        stages_label = QLabel("Этапы, мс")
+        stages_label.setStyleSheet("font-weight: bold; font-size: 12pt;")
+        layout.addWidget(stages_label)
+        self.stages_table = QTableWidget(0, len(STAGE_COLUMNS))
+        self.stages_table.setHorizontalHeaderLabels(STAGE_COLUMNS)
+        layout.addWidget(self.stages_table)
+
+        counters_label = QLabel("Счётчики")
+        counters_label.setStyleSheet("font-weight: bold; font-size: 12pt;")
+        layout.addWidget(counters_label)
+        self.counters_table = QTableWidget(0, 2)
+        self.counters_table.setHorizontalHeaderLabels(["value", "per s"])
+        layout.addWidget(self.counters_table)
+
+        controls = QHBoxLayout()
+        self.status_label = QLabel("")
+        controls.addWidget(self.status_label)
+        controls.addStretch()
+        reset_btn = QPushButton("Сбросить")
+        reset_btn.clicked.connect(self.reset)
+        controls.addWidget(reset_btn)
+        layout.addLayout(controls)
+        if export_path:
+            layout.addWidget(QLabel(f"Экспорт: {export_path}"))
+        self.setLayout(layout)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        """Show the current values"""
+        snapshot = self.metrics.snapshot()
+        stages = sorted(snapshot['histograms'].items())
+        self.stages_table.setRowCount(len(stages))
+        self.stages_table.setVerticalHeaderLabels([name for name, _ in stages])
+        for row, (_, histogram) in enumerate(stages):
+            for column, stat in enumerate(STAGE_COLUMNS):
+                value = histogram[stat]
+                text = str(value) if stat == 'count' else _ms(value)
+                self.stages_table.setItem(row, column, QTableWidgetItem(text))
+
+        uptime = max(snapshot['uptime'], 1e-9)
+        counters = sorted(snapshot['counters'].items()) + sorted(snapshot['gauges'].items())
+        self.counters_table.setRowCount(len(counters))
+        self.counters_table.setVerticalHeaderLabels([name for name, _ in counters])
+        for row, (name, value) in enumerate(counters):
+            rate = f"{value / uptime:.1f}" if name in snapshot['counters'] else ""
+            self.counters_table.setItem(row, 0, QTableWidgetItem(str(value)))
+            self.counters_table.setItem(row, 1, QTableWidgetItem(rate))
+        self.status_label.setText(f"За {uptime:.0f} с")
+
+    def reset(self):
+        """Start counting from zero"""
+        self.metrics.reset()
+        self.refresh()
+
+    def closeEvent(self, event):
+        """Stop refreshing while hidden"""
+        self._timer.stop()
+        super().closeEvent(event)
+
+    def showEvent(self, event):
+        """Resume refreshing"""
+        self._timer.start(1000)
+        self.refresh()
+        super().showEvent(event)
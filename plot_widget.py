@@ -0,0 +1,195 @@
+import time
+from PyQt6.QtCore import Qt, QPointF, QRectF
+from PyQt6.QtGui import QColor, QPainter, QPainterPath, QPen
+from PyQt6.QtWidgets import QWidget
+from lod_pyramid import MinMaxPyramid
+
+# Pyramid entries kept per level and series; older data is drawn coarser
+PLOT_HISTORY = 65536
+SERIES_COLORS = ['#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd',
+                 '#8c564b', '#e377c2', '#17becf', '#7f7f7f', '#bcbd22']
+
+
+class LivePlotWidget(QWidget):
+    """Live chart of every GPIO series
+
+    Each series is kept in a MinMaxPyramid, so a repaint draws at most a few
+    buckets per pixel column whatever the recording length, and memory stays
+    bounded because only the newest PLOT_HISTORY entries of each level are
+    kept. The view follows
+    the newest data until the user zooms (mouse wheel) or pans (drag);
+    double-click returns to following.
+    """
+
+    MARGIN = 40
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series = {}  # Name -> MinMaxPyramid
+        self._colors = {}
+        self._view = None  # (start, end) while zoomed/panned, None = follow
+        self._drag_x = None
+        self.setMinimumHeight(180)
+        self.setStyleSheet("background-color: white;")
+
+    def add_rows(self, samples):
+        """Feed a batch of (timestamp, {name: number or numeric string}) samples with one repaint"""
+        for timestamp, values in samples:
+            self._add(timestamp, values)
+        self.update()
+
+    def _add(self, timestamp, values):
+        for name, value in values.items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if value != value:
+                continue
+            pyramid = self.series.get(name)
+            if pyramid is None:
+                pyramid = self.series[name] = MinMaxPyramid(max_entries=PLOT_HISTORY)
+                self._colors[name] = QColor(SERIES_COLORS[len(self._colors) % len(SERIES_COLORS)])
+            pyramid.append(timestamp, value)
+
+    def add_samples(self, timestamps, columns):
+        """Feed many samples given as parallel sequences"""
+        names = list(columns)
+        for i, timestamp in enumerate(timestamps):
+            self._add(timestamp, {name: columns[name][i] for name in names})
+        self.update()
+
+    def clear(self):
+        """Remove every series"""
+        self.series = {}
+        self._colors = {}
+        self._view = None
+        self.update()
+
+    def data_range(self):
+        """(first, last) timestamp over all series, or None"""
+        bounds = [(p.first_time(), p.times[-1]) for p in self.series.values() if len(p)]
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    def visible_range(self):
+        """Time range currently drawn"""
+        if self._view is not None:
+            return self._view
+        return self.data_range()
+
+    # --- Interaction ---
+
+    def wheelEvent(self, event):
+        """Zoom around the cursor"""
+        view = self.visible_range()
+        if view is None:
+            return
+        start, end = view
+        plot = self._plot_rect()
+        fraction = min(max((event.position().x() - plot.left()) / max(plot.width(), 1), 0.0), 1.0)
+        anchor = start + (end - start) * fraction
+        scale = 0.8 if event.angleDelta().y() > 0 else 1.25
+        span = max((end - start) * scale, 1e-3)
+        self._view = (anchor - span * fraction, anchor + span * (1 - fraction))
+        self.update()
+
+    def mousePressEvent(self, event):
+        """Start panning"""
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_x = event.position().x()
+
+    def mouseMoveEvent(self, event):
+        """Pan by the dragged distance"""
+        if self._drag_x is None:
+            return
+        view = self.visible_range()
+        if view is None:
+            return
+        start, end = view
+        dx = event.position().x() - self._drag_x
+        self._drag_x = event.position().x()
+        shift = -dx / max(self._plot_rect().width(), 1) * (end - start)
+        self._view = (start + shift, end + shift)
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        """Stop panning"""
+        self._drag_x = None
+
+    def mouseDoubleClickEvent(self, event):
+        """Go back to following live data"""
+        self._view = None
+        self.update()
+
+    # --- Drawing ---
+
+    def _plot_rect(self):
+        """Area inside the axes"""
+        return QRectF(self.MARGIN, 10, max(self.width() - self.MARGIN - 10, 1), max(self.height() - self.MARGIN, 1))
+
+    def paintEvent(self, event):
+        """Draw axes and one min/max envelope per series"""
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('white'))
+        plot = self._plot_rect()
+        painter.setPen(QPen(QColor('black'), 1))
+        painter.drawRect(plot)
+
+        view = self.visible_range()
+        if view is None:
+            painter.end()
+            return
+        start, end = view
+        if end <= start:
+            start, end = start - 0.5, end + 0.5
+
+        # One query per series, at most two buckets per pixel column
+        pixels = int(plot.width())
+        buckets = {name: p.query(start, end, pixels * 2) for name, p in self.series.items()}
+        lows = [b[2] for series in buckets.values() for b in series]
+        highs = [b[3] for series in buckets.values() for b in series]
+        if not lows:
+            painter.end()
+            return
+        low, high = min(lows), max(highs)
+        if high <= low:
+            low, high = low - 1, high + 1
+
+        def x_of(t):
+            return plot.left() + (t - start) / (end - start) * plot.width()
+
+        def y_of(v):
+            return plot.bottom() - (v - low) / (high - low) * plot.height()
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setClipRect(plot)
+        legend_y = plot.top() + 12
+        for name, series in buckets.items():
+            if not series:
+                continue
+            color = self._colors[name]
+            painter.setPen(QPen(color, 1))
+            path = QPainterPath()
+            for i, (t_first, t_last, v_min, v_max) in enumerate(series):
+                x = x_of((t_first + t_last) / 2)
+                if i == 0:
+                    path.moveTo(QPointF(x, y_of(v_min)))
+                else:
+                    path.lineTo(QPointF(x, y_of(v_min)))
+                if v_max != v_min:
+                    path.lineTo(QPointF(x, y_of(v_max)))
+            painter.drawPath(path)
+            painter.drawText(QPointF(plot.right() - 70, legend_y), name)
+            legend_y += 14
+        painter.setClipping(False)
+
+        # Axis labels: value range and time range
+        painter.setPen(QPen(QColor('black'), 1))
+        painter.drawText(QPointF(2, plot.top() + 10), f"{high:g}")
+        painter.drawText(QPointF(2, plot.bottom()), f"{low:g}")
+        painter.drawText(QPointF(plot.left(), plot.bottom() + 16), time.strftime("%d.%m %H:%M:%S", time.localtime(start)))
+        end_label = time.strftime("%d.%m %H:%M:%S", time.localtime(end))
+        painter.drawText(QPointF(plot.right() - painter.fontMetrics().horizontalAdvance(end_label), plot.bottom() + 16), end_label)
+        painter.end()
@@ -0,0 +1,46 @@
+from PyQt6.QtCore import QDateTime
+from PyQt6.QtWidgets import QDialog, QDialogButtonBox, QDateTimeEdit, QFormLayout
+
+DISPLAY_FORMAT = "dd.MM.yyyy HH:mm:ss"
+
+
+class RangeDialog(QDialog):
+    """Asks for a start and end time, e.g. of samples to load from storage"""
+
+    def __init__(self, title, parent=None, hours=1, span=None):
+        """
+        :param title: Window title
+        :param hours: The range offered first ends now and starts this many hours earlier
+        :param span: (start, end) epoch seconds to offer instead, e.g. all of a file
+        """
+        super().__init__(parent)
+        self.setWindowTitle(title)
+
+        if span is None:
+            end = QDateTime.currentDateTime()
+            start = end.addSecs(-hours * 3600)
+        else:
+            # Whole seconds, widened so the first and last sample stay inside
+            start = QDateTime.fromSecsSinceEpoch(int(span[0]))
+            end = QDateTime.fromSecsSinceEpoch(int(span[1]) + 1)
+        self.start_edit = QDateTimeEdit(start)
+        self.end_edit = QDateTimeEdit(end)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat(DISPLAY_FORMAT)
+            edit.setCalendarPopup(True)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout()
+        layout.addRow("С", self.start_edit)
+        layout.addRow("По", self.end_edit)
+        layout.addRow(buttons)
+        self.setLayout(layout)
+
+    def time_range(self):
+        """Chosen (start, end) in epoch seconds, earlier one first"""
+        start = self.start_edit.dateTime().toSecsSinceEpoch()
+        end = self.end_edit.dateTime().toSecsSinceEpoch()
+        return min(start, end), max(start, end)
@@ -0,0 +1,348 @@
+"""Compact binary recording format for sensor samples (.wrec)
+
+Layout, all integers little-endian:
+
+    b'WREC' u16 version
+    chunk*                      one per chunk_rows samples
+    index                       names table + one entry per chunk
+    u64 index offset, b'WIDX'
+
+A chunk stores u32 rows, u16 column count, u16 column ids, then int64
+timestamps in microseconds followed by one float64 array per column (NaN for
+a missing value). The index keeps the time range and per-column min/max of
+every chunk, so a time-range read only seeks to the chunks that overlap it.
+"""
+import csv
+import os
+import struct
+import sys
+import time
+from array import array
+from csv_format import (
+    DATE_FORMAT, MISSING, TimestampParser, format_time, format_value, parse_value
+)
+
+MAGIC = b'WREC'
+INDEX_MAGIC = b'WIDX'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sH')
+_TRAILER = struct.Struct('<Q4s')
+_CHUNK_HEAD = struct.Struct('<IH')
+_ENTRY = struct.Struct('<QIqqH')
+_COLUMN_STATS = struct.Struct('<Hdd')
+
+
+def _to_le(values):
+    """Bytes of an array in little-endian order"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode, data):
+    """Array from little-endian bytes"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class ChunkInfo:
+    """Index entry describing one chunk"""
+
+    def __init__(self, offset, rows, t_min, t_max, stats):
+        self.offset = offset
+        self.rows = rows
+        self.t_min = t_min  # Microseconds
+        self.t_max = t_max
+        self.stats = stats  # Column id -> (min, max)
+
+    def overlaps(self, start_us, end_us):
+        """Check if the chunk has samples within [start_us, end_us]"""
+        return self.t_max >= start_us and self.t_min <= end_us
+
+
+class RecordingWriter:
+    """Writes samples into a .wrec file chunk by chunk"""
+
+    def __init__(self, path, chunk_rows=4096):
+        """
+        :param path: Output file, overwritten
+        :param chunk_rows: Samples per chunk
+        """
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._names = []  # Column id -> name
+        self._ids = {}
+        self._chunks = []
+        self._timestamps = array('q')
+        self._columns = {}  # Column id -> array('d') for the open chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _column_id(self, name):
+        """Register a column name and return its id"""
+        column_id = self._ids.get(name)
+        if column_id is None:
+            column_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = column_id
+        return column_id
+
+    def append(self, timestamp, values):
+        """Add one sample; values maps column name -> number (None = missing)"""
+        row = len(self._timestamps)
+        self._timestamps.append(int(round(timestamp * 1e6)))
+        for name, value in values.items():
+            column = self._columns.get(self._column_id(name))
+            if column is None:
+                column = array('d', [MISSING]) * row
+                self._columns[self._ids[name]] = column
+            column.append(MISSING if value is None or value == '' else float(value))
+        for column in self._columns.values():
+            if len(column) == row:
+                column.append(MISSING)
+        if len(self._timestamps) >= self.chunk_rows:
+            self._write_chunk()
+
+    def append_columns(self, timestamps, columns):
+        """Add many samples given as parallel sequences
+
+        :param timestamps: Epoch seconds
+        :param columns: Dict column name -> sequence of numbers (None = missing)
+        """
+        names = list(columns)
+        for i, timestamp in enumerate(timestamps):
+            self.append(timestamp, {name: columns[name][i] for name in names})
+
+    @property
+    def columns(self):
+        """Column names in id order"""
+        return self._names
+
+    @property
+    def chunks(self):
+        """Index entries of the chunks written so far"""
+        return self._chunks
+
+    def flush(self):
+        """Write the buffered samples as a chunk now and push it to the OS
+
+        Chunks written so far can then be read through
+        RecordingReader(path, index=(writer.columns, writer.chunks)).
+        """
+        self._write_chunk()
+        self._file.flush()
+
+    def _write_chunk(self):
+        """Write the buffered samples as one chunk"""
+        rows = len(self._timestamps)
+        if not rows:
+            return
+        offset = self._file.tell()
+        ids = sorted(self._columns)
+        self._file.write(_CHUNK_HEAD.pack(rows, len(ids)))
+        self._file.write(struct.pack(f'<{len(ids)}H', *ids))
+        self._file.write(_to_le(self._timestamps))
+        stats = {}
+        for column_id in ids:
+            column = self._columns[column_id]
+            self._file.write(_to_le(column))
+            present = [v for v in column if v == v]
+            stats[column_id] = (min(present), max(present)) if present else (MISSING, MISSING)
+        self._chunks.append(ChunkInfo(offset, rows, min(self._timestamps), max(self._timestamps), stats))
+        self._timestamps = array('q')
+        self._columns = {}
+
+    def close(self):
+        """Write the last chunk and the index"""
+        if self._file is None:
+            return
+        self._write_chunk()
+        index_offset = self._file.tell()
+        out = self._file
+        out.write(struct.pack('<H', len(self._names)))
+        for name in self._names:
+            encoded = name.encode('utf-8')
+            out.write(struct.pack('<H', len(encoded)) + encoded)
+        out.write(struct.pack('<I', len(self._chunks)))
+        for chunk in self._chunks:
+            out.write(_ENTRY.pack(chunk.offset, chunk.rows, chunk.t_min, chunk.t_max, len(chunk.stats)))
+            for column_id, (low, high) in sorted(chunk.stats.items()):
+                out.write(_COLUMN_STATS.pack(column_id, low, high))
+        out.write(_TRAILER.pack(index_offset, INDEX_MAGIC))
+        out.close()
+        self._file = None
+
+
+class RecordingReader:
+    """Random access to a .wrec file through its chunk index"""
+
+    def __init__(self, path, index=None):
+        """Open the file and load its index
+
+        :param index: (columns, chunks) of a file still being written, taken
+                      from its RecordingWriter; the trailing index is not read
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, version = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is not a recording file")
+        if index is not None:
+            self.columns, self.chunks = index
+            return
+        self._file.seek(-_TRAILER.size, os.SEEK_END)
+        index_offset, index_magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+        if index_magic != INDEX_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} has no index (incomplete recording?)")
+        self._file.seek(index_offset)
+        self.columns = []
+        (count,) = struct.unpack('<H', self._file.read(2))
+        for _ in range(count):
+            (length,) = struct.unpack('<H', self._file.read(2))
+            self.columns.append(self._file.read(length).decode('utf-8'))
+        self.chunks = []
+        (chunk_count,) = struct.unpack('<I', self._file.read(4))
+        for _ in range(chunk_count):
+            offset, rows, t_min, t_max, stat_count = _ENTRY.unpack(self._file.read(_ENTRY.size))
+            stats = {}
+            for _ in range(stat_count):
+                column_id, low, high = _COLUMN_STATS.unpack(self._file.read(_COLUMN_STATS.size))
+                stats[column_id] = (low, high)
+            self.chunks.append(ChunkInfo(offset, rows, t_min, t_max, stats))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def row_count(self):
+        """Total number of samples"""
+        return sum(chunk.rows for chunk in self.chunks)
+
+    def time_range(self):
+        """(first, last) timestamp in epoch seconds, or None when empty"""
+        if not self.chunks:
+            return None
+        return (min(c.t_min for c in self.chunks) / 1e6, max(c.t_max for c in self.chunks) / 1e6)
+
+    def read_chunk(self, number, columns=None):
+        """Load one chunk
+
+        :return: (array('d') timestamps in seconds, dict name -> array('d'))
+        """
+        chunk = self.chunks[number]
+        self._file.seek(chunk.offset)
+        rows, count = _CHUNK_HEAD.unpack(self._file.read(_CHUNK_HEAD.size))
+        ids = struct.unpack(f'<{count}H', self._file.read(2 * count))
+        raw_times = _from_le('q', self._file.read(8 * rows))
+        timestamps = array('d', (t / 1e6 for t in raw_times))
+        wanted = None if columns is None else set(columns)
+        values = {}
+        for column_id in ids:
+            name = self.columns[column_id]
+            if wanted is not None and name not in wanted:
+                self._file.seek(8 * rows, os.SEEK_CUR)
+                continue
+            values[name] = _from_le('d', self._file.read(8 * rows))
+        return timestamps, values
+
+    def read(self, start=None, end=None, columns=None):
+        """Read every sample with start <= timestamp <= end
+
+        Only chunks whose indexed time range overlaps the request are read.
+        :return: (array('d') timestamps, dict name -> array('d'))
+        """
+        start_us = -2 ** 63 if start is None else int(start * 1e6)
+        end_us = 2 ** 63 - 1 if end is None else int(end * 1e6)
+        names = self.columns if columns is None else [n for n in self.columns if n in set(columns)]
+        timestamps = array('d')
+        result = {name: array('d') for name in names}
+        for number, chunk in enumerate(self.chunks):
+            if not chunk.overlaps(start_us, end_us):
+                continue
+            chunk_times, chunk_values = self.read_chunk(number, names)
+            if chunk.t_min >= start_us and chunk.t_max <= end_us:
+                keep = range(len(chunk_times))
+            else:
+                keep = [i for i, t in enumerate(chunk_times) if start_us <= int(t * 1e6) <= end_us]
+            full = len(keep) == len(chunk_times)
+            timestamps.extend(chunk_times if full else (chunk_times[i] for i in keep))
+            for name in names:
+                column = chunk_values.get(name)
+                if column is None:
+                    result[name].extend(array('d', [MISSING]) * len(keep))
+                elif full:
+                    result[name].extend(column)
+                else:
+                    result[name].extend(column[i] for i in keep)
+        return timestamps, result
+
+    def close(self):
+        """Close the file"""
+        self._file.close()
+
+
+def csv_to_recording(csv_path, recording_path, chunk_rows=4096):
+    """Convert a ';'-delimited Date;Time;GPIO... CSV file to .wrec"""
+    parser = TimestampParser()
+    with open(csv_path, 'r', encoding='utf-8') as file, RecordingWriter(recording_path, chunk_rows) as writer:
+        reader = csv.reader(file, delimiter=';')
+        headers = next(reader, [])
+        date_index = headers.index("Date")
+        time_index = headers.index("Time")
+        value_indexes = [(j, h) for j, h in enumerate(headers) if h not in ("Date", "Time")]
+        for row in reader:
+            if len(row) <= max(date_index, time_index):
+                continue
+            timestamp = parser.parse(row[date_index], row[time_index])
+            if timestamp is None:
+                continue
+            writer.append(timestamp, {h: parse_value(row[j]) if j < len(row) else None for j, h in value_indexes})
+
+
+def recording_to_csv(recording_path, csv_path, start=None, end=None):
+    """Convert a .wrec file (or a time range of it) to the CSV layout"""
+    with RecordingReader(recording_path) as reader:
+        names = sorted(reader.columns)
+        with open(csv_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, delimiter=';')
+            writer.writerow(["Date", "Time"] + names)
+            for number, chunk in enumerate(reader.chunks):
+                if start is not None and chunk.t_max < start * 1e6:
+                    continue
+                if end is not None and chunk.t_min > end * 1e6:
+                    continue
+                timestamps, values = reader.read_chunk(number)
+                for i, timestamp in enumerate(timestamps):
+                    if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                        continue
+                    local = time.localtime(timestamp)
+                    row = [time.strftime(DATE_FORMAT, local), format_time(local, timestamp)]
+                    for name in names:
+                        column = values.get(name)
+                        row.append(format_value(column[i]) if column is not None else "")
+                    writer.writerow(row)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] not in ('to-csv', 'from-csv'):
+        print("Usage: python recording_format.py to-csv|from-csv <input> <output>")
+        sys.exit(1)
+    if sys.argv[1] == 'to-csv':
+        recording_to_csv(sys.argv[2], sys.argv[3])
+    else:
+        csv_to_recording(sys.argv[2], sys.argv[3])
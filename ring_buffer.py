@@ -0,0 +1,240 @@
+import os
+import tempfile
+from array import array
+from collections import OrderedDict
+from csv_format import MISSING, parse_value
+from recording_format import RecordingWriter, RecordingReader
+
+
+class RingSnapshot:
+    """Rows of a SampleRing at the time of SampleRing.snapshot()"""
+
+    def __init__(self, spill_path, index, timestamps, columns):
+        self.spill_path = spill_path
+        self.index = index  # (columns, chunks) of the spill file, None if nothing spilled
+        self.timestamps = timestamps
+        self.columns = columns
+        self.spilled = sum(chunk.rows for chunk in index[1]) if index else 0
+
+    def __len__(self):
+        return self.spilled + len(self.timestamps)
+
+    def iter_rows(self):
+        """Yield (timestamp, {name: float}) oldest first; missing values are left out"""
+        if self.index is not None:
+            with RecordingReader(self.spill_path, index=self.index) as reader:
+                for number in range(len(reader.chunks)):
+                    timestamps, columns = reader.read_chunk(number)
+                    yield from _rows(timestamps, columns)
+        yield from _rows(self.timestamps, self.columns)
+
+
+def _rows(timestamps, columns):
+    """(timestamp, {name: value}) per row of column arrays, NaN left out"""
+    items = list(columns.items())
+    for i, timestamp in enumerate(timestamps):
+        values = {}
+        for name, column in items:
+            value = column[i]
+            if value == value:
+                values[name] = value
+        yield timestamp, values
+
+
+class SampleRing:
+    """Live samples with bounded memory
+
+    The newest samples live in fixed-size column arrays used as a ring. When
+    the ring is full its oldest spill_block rows are written as one chunk to
+    a scratch .wrec file and their slots are reused, so memory stays the
+    same however long a session runs. Rows that were spilled are still
+    readable by index; their chunks are loaded back on demand and the last
+    few are kept in an LRU cache, so scrolling through old rows touches the
+    disk once per chunk.
+    """
+
+    def __init__(self, capacity=100000, spill_block=4096, spill_path=None, cached_chunks=8):
+        """
+        :param capacity: Rows kept in memory
+        :param spill_block: Rows written to disk at a time
+        :param spill_path: Scratch file; a temporary file when None
+        :param cached_chunks: Spilled chunks kept in memory for reading
+        """
+        if not 0 < spill_block <= capacity:
+            raise ValueError("spill_block must be between 1 and capacity")
+        self.capacity = capacity
+        self.spill_block = spill_block
+        self.cached_chunks = cached_chunks
+        self._spill_path = spill_path
+        self._own_spill_file = spill_path is None
+        self._writer = None
+        self._reader = None
+        self._cache = OrderedDict()  # Chunk number -> (timestamps, {name: array})
+        self._timestamps = array('d', [0.0]) * capacity
+        self._columns = {}  # Name -> array('d') of capacity slots
+        self._start = 0  # Slot of the oldest row in memory
+        self._count = 0  # Rows in memory
+        self.spilled = 0  # Rows on disk; they come before the rows in memory
+
+    def __len__(self):
+        return self.spilled + self._count
+
+    def names(self):
+        """Column names"""
+        return list(self._columns)
+
+    def add_column(self, name):
+        """Add a column, missing for every row so far"""
+        if name not in self._columns:
+            self._columns[name] = array('d', [MISSING]) * self.capacity
+
+    def append(self, timestamp, values):
+        """Append one row
+
+        :param values: Dict name -> number; None and numeric strings are
+                       accepted too. Absent columns are missing, unknown
+                       names are left out.
+        """
+        if self._count == self.capacity:
+            self._spill()
+        slot = (self._start + self._count) % self.capacity
+        self._timestamps[slot] = timestamp
+        columns = self._columns
+        written = 0
+        for name, value in values.items():
+            column = columns.get(name)
+            if column is not None:
+                try:
+                    column[slot] = value
+                except TypeError:
+                    column[slot] = parse_value(value)
+                written += 1
+        if written < len(columns):
+            for name, column in columns.items():
+                if name not in values:
+                    column[slot] = MISSING
+        self._count += 1
+
+    def timestamp(self, row):
+        """Timestamp of a row"""
+        if row >= self.spilled:
+            return self._timestamps[self._slot(row)]
+        timestamps, _ = self._load(row // self.spill_block)
+        return timestamps[row % self.spill_block]
+
+    def value(self, name, row):
+        """Value of one cell, NaN if missing"""
+        if row >= self.spilled:
+            return self._columns[name][self._slot(row)]
+        _, columns = self._load(row // self.spill_block)
+        column = columns.get(name)
+        return MISSING if column is None else column[row % self.spill_block]
+
+    def _slot(self, row):
+        """Ring slot of an in-memory row"""
+        return (self._start + row - self.spilled) % self.capacity
+
+    def _spill(self):
+        """Move the oldest spill_block rows to disk"""
+        if self._writer is None:
+            if self._spill_path is None:
+                handle, self._spill_path = tempfile.mkstemp(prefix='weather_spill_', suffix='.wrec')
+                os.close(handle)
+            self._writer = RecordingWriter(self._spill_path, chunk_rows=self.spill_block)
+        block = self.spill_block
+        first = self._start
+        split = min(first + block, self.capacity)
+        timestamps = self._timestamps[first:split] + self._timestamps[:block - (split - first)]
+        columns = {
+            name: column[first:split] + column[:block - (split - first)]
+            for name, column in self._columns.items()
+        }
+        self._writer.append_columns(timestamps, columns)
+        self._writer.flush()
+        self._start = (self._start + block) % self.capacity
+        self._count -= block
+        self.spilled += block
+
+    def read_columns(self):
+        """Every row, spilled ones included, in bulk
+
+        :return: (array('d') timestamps, dict name -> array('d'))
+        """
+        timestamps = array('d')
+        columns = {name: array('d') for name in self._columns}
+        for number in range(self.spilled // self.spill_block):
+            chunk_times, chunk_values = self._chunk_reader().read_chunk(number)
+            timestamps.extend(chunk_times)
+            for name, column in columns.items():
+                values = chunk_values.get(name)
+                column.extend(values if values is not None else array('d', [MISSING]) * len(chunk_times))
+        memory_times, memory_columns = self._memory_rows()
+        timestamps.extend(memory_times)
+        for name, column in columns.items():
+            column.extend(memory_columns[name])
+        return timestamps, columns
+
+    def _memory_rows(self):
+        """Copies of the in-memory rows, oldest first: (timestamps, {name: array})"""
+        first = self._start
+        split = min(first + self._count, self.capacity)
+        wrapped = self._count - (split - first)
+        timestamps = self._timestamps[first:split] + self._timestamps[:wrapped]
+        columns = {name: ring[first:split] + ring[:wrapped] for name, ring in self._columns.items()}
+        return timestamps, columns
+
+    def snapshot(self):
+        """Frozen view of the rows so far that another thread can read
+
+        In-memory rows are copied. Spilled chunks never change once written,
+        so they stay on disk and are read through a copy of today's index.
+        """
+        index = None
+        if self._writer is not None:
+            index = (list(self._writer.columns), list(self._writer.chunks))
+        timestamps, columns = self._memory_rows()
+        return RingSnapshot(self._spill_path, index, timestamps, columns)
+
+    def _chunk_reader(self):
+        """Reader over the chunks spilled so far"""
+        if self._reader is None:
+            self._reader = RecordingReader(self._spill_path, index=(self._writer.columns, self._writer.chunks))
+        return self._reader
+
+    def _load(self, number):
+        """Columns of a spilled chunk, through the LRU cache"""
+        chunk = self._cache.get(number)
+        if chunk is not None:
+            self._cache.move_to_end(number)
+            return chunk
+        chunk = self._chunk_reader().read_chunk(number)
+        self._cache[number] = chunk
+        if len(self._cache) > self.cached_chunks:
+            self._cache.popitem(last=False)
+        return chunk
+
+    def clear(self):
+        """Drop every row and column and delete the scratch file"""
+        self.close()
+        self._timestamps = array('d', [0.0]) * self.capacity
+        self._columns = {}
+        self._start = 0
+        self._count = 0
+        self.spilled = 0
+
+    def close(self):
+        """Close and delete the scratch file"""
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._cache.clear()
+        if self._spill_path is not None and os.path.exists(self._spill_path):
+            try:
+                os.remove(self._spill_path)
+            except OSError as e:
+                print(f"⚠️ Could not delete spill file {self._spill_path}: {e}")
+        if self._own_spill_file:
+            self._spill_path = None
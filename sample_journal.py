@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from array import array
+
+from csv_format import MISSING
+
+SCHEMA_PREFIX = '#columns'
+DELIMITER = ';'
+COLUMNS_SUFFIX = '.columns'  # Current column list next to the journal
+PREVIOUS_SUFFIX = '.prev.'  # rotate() moves the journal to path + '.prev.<n>'
+
+
+class SampleJournal:
+    """Append-only, crash-safe log of incoming samples
+
+    Each sample becomes one line "timestamp;value;value;...". Whenever a new
+    column shows up, a "#columns;GPIO4;GPIO5;..." line is written first, so the
+    journal can be replayed without any outside schema. Lines are flushed and
+    fsynced in batches: after flush_rows samples or flush_interval seconds,
+    whichever comes first. A crash loses at most the unflushed batch.
+    The current column list is also kept in path + '.columns', so reopening
+    a long journal does not have to read it. Safe to use from the
+    acquisition thread and the GUI thread at once.
+    """
+
+    def __init__(self, path='session.journal', flush_rows=50, flush_interval=2.0):
+        """
+        :param path: Journal file
+        :param flush_rows: Samples per fsync batch
+        :param flush_interval: Maximum seconds between fsyncs while samples arrive
+        """
+        self.path = path
+        self.columns_path = path + COLUMNS_SUFFIX
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._file = None
+        self._columns = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+    def open(self):
+        """Open the journal for appending, continuing an existing session"""
+        with self._lock:
+            if self._file is not None:
+                return
+            self._columns = []
+            if os.path.exists(self.path):
+                self._columns = read_columns(self.path)
+                self._drop_torn_line()
+            self._file = open(self.path, 'a', encoding='utf-8', newline='\n')
+            if self._columns:
+                # Restate the schema so a torn tail line cannot corrupt later rows
+                self._write_schema()
+            self._last_flush = time.monotonic()
+
+    def _drop_torn_line(self):
+        """Cut off a last line that a crash left without its newline
+
+        Appending after it would merge it with the next line into one
+        garbled row or schema line.
+        """
+        with open(self.path, 'rb+') as file:
+            end = file.seek(0, os.SEEK_END)
+            if not end:
+                return
+            file.seek(end - 1)
+            if file.read(1) == b'\n':
+                return
+            while end > 0:
+                start = max(0, end - 4096)
+                file.seek(start)
+                newline = file.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    file.truncate(start + newline + 1)
+                    return
+                end = start
+            file.truncate(0)
+
+    def append(self, timestamp, values):
+        """Record one sample; values maps column name -> value"""
+        with self._lock:
+            if self._file is None:
+                self.open()
+            self._append(timestamp, values)
+
+    def _append(self, timestamp, values):
+        """Write one sample line, caller holds the lock"""
+        new_columns = [name for name in values if name not in self._columns]
+        if new_columns:
+            self._columns.extend(sorted(new_columns))
+            self._write_schema()
+
+        fields = [repr(timestamp)]
+        for name in self._columns:
+            value = values.get(name)
+            fields.append('' if value is None else str(value))
+        self._file.write(DELIMITER.join(fields) + '\n')
+
+        self._pending += 1
+        if self._pending >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Push buffered lines to disk"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush and close the journal"""
+        with self._lock:
+            if self._file is None:
+                return
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def truncate(self, previous=False):
+        """Discard the journal and start an empty session
+
+        :param previous: Also discard the journals moved aside by rotate()
+        """
+        with self._lock:
+            self.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._forget_columns()
+            if previous:
+                self.discard_previous()
+
+    def rotate(self):
+        """Move the journal aside to path + '.prev.<n>' and start an empty session
+
+        Journals moved aside earlier are kept, numbered in order, until
+        discard_previous() removes them.
+        :return: Path of the moved journal, or None if there was no journal
+        """
+        with self._lock:
+            self.close()
+            self._forget_columns()
+            if not os.path.exists(self.path):
+                return None
+            numbers = self._previous_numbers()
+            previous = f"{self.path}{PREVIOUS_SUFFIX}{numbers[-1] + 1 if numbers else 1}"
+            os.replace(self.path, previous)
+            return previous
+
+    def previous(self):
+        """Paths of the journals moved aside by rotate(), oldest first"""
+        return [f"{self.path}{PREVIOUS_SUFFIX}{number}" for number in self._previous_numbers()]
+
+    def discard_previous(self, paths=None):
+        """Remove journals moved aside by rotate(), all of them when paths is None"""
+        for path in self.previous() if paths is None else paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _previous_numbers(self):
+        directory = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + PREVIOUS_SUFFIX
+        return sorted(
+            int(name[len(prefix):]) for name in os.listdir(directory)
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        )
+
+    def _forget_columns(self):
+        self._columns = []
+        if os.path.exists(self.columns_path):
+            os.remove(self.columns_path)
+
+    def _write_schema(self):
+        """Write the current column list inline and into the .columns file"""
+        self._file.write(DELIMITER.join([SCHEMA_PREFIX] + self._columns) + '\n')
+        temporary = self.columns_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8', newline='\n') as file:
+            file.write(DELIMITER.join(self._columns) + '\n')
+        os.replace(temporary, self.columns_path)
+
+
+def read_columns(path):
+    """Column names of a journal in the order its rows use them
+
+    Taken from the .columns file when there is one; otherwise only the
+    schema lines of the journal are looked at.
+    """
+    try:
+        with open(path + COLUMNS_SUFFIX, 'r', encoding='utf-8') as file:
+            line = file.readline().rstrip('\n')
+        return line.split(DELIMITER) if line else []
+    except FileNotFoundError:
+        pass
+    columns = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            for line in file:
+                if line.startswith(SCHEMA_PREFIX) and line.endswith('\n'):
+                    for name in line.rstrip('\n').split(DELIMITER)[1:]:
+                        if name not in columns:
+                            columns.append(name)
+    except FileNotFoundError:
+        pass
+    return columns
+
+
+def replay(*paths):
+    """Read one or more journals back, in order, as one
+
+    Each row is read in the column order of the schema line before it.
+    :return: (column names, array('d') of timestamps, list of array('d') per
+             column) with MISSING (NaN) for a missing or non-numeric value.
+             A torn last line left by a crash is skipped, and so is a
+             journal that does not exist.
+    """
+    columns = []
+    slots = {}  # Column name -> index into columns
+    timestamps = array('d')
+    values = []
+    for path in paths:
+        order = []  # Slot of each cell of the rows that follow, from the last schema line
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                for line in file:
+                    if not line.endswith('\n'):
+                        break  # Incomplete write at crash time
+                    fields = line.rstrip('\n').split(DELIMITER)
+                    if fields[0] == SCHEMA_PREFIX:
+                        order = []
+                        for name in fields[1:]:
+                            if name not in slots:
+                                slots[name] = len(columns)
+                                columns.append(name)
+                                values.append(array('d', [MISSING]) * len(timestamps))
+                            order.append(slots[name])
+                        continue
+                    try:
+                        timestamp = float(fields[0])
+                    except ValueError:
+                        continue
+                    timestamps.append(timestamp)
+                    for column_values in values:
+                        column_values.append(MISSING)
+                    for slot, cell in zip(order, fields[1:]):
+                        if cell:
+                            try:
+                                values[slot][-1] = float(cell)
+                            except ValueError:
+                                pass
+        except FileNotFoundError:
+            pass
+    return columns, timestamps, values
@@ -0,0 +1,16 @@
+"""Shared column names for sample values
+
+The parsers name every GPIO value through gpio_name(), so all samples of a
+pin share one "GPIO<pin>" string instead of formatting a new one per frame.
+"""
+
+_GPIO_NAMES = {}  # Pin number -> "GPIO<pin>", one string per pin
+
+
+def gpio_name(pin):
+    """Column name of a GPIO number, e.g. 4 -> 'GPIO4'"""
+    name = _GPIO_NAMES.get(pin)
+    if name is None:
+        name = _GPIO_NAMES[pin] = f"GPIO{pin}"
+    return name
+
@@ -0,0 +1,234 @@
+import sqlite3
+import threading
+import time
+from array import array
+from csv_format import MISSING
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (device, name)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    timestamp REAL NOT NULL,
+    series INTEGER NOT NULL REFERENCES series (id),
+    value NUMERIC
+);
+CREATE INDEX IF NOT EXISTS samples_by_time ON samples (timestamp);
+CREATE INDEX IF NOT EXISTS samples_by_series ON samples (series, timestamp);
+"""
+
+
+def split_column(column):
+    """'COM5:GPIO4' -> ('COM5', 'GPIO4'); a single-device 'GPIO4' -> ('', 'GPIO4')"""
+    device, _, name = column.rpartition(':')
+    return device, name
+
+
+def join_column(device, name):
+    """Inverse of split_column"""
+    return f"{device}:{name}" if device else name
+
+
+class SampleStore:
+    """Samples in an SQLite database, one row per value
+
+    The database runs in WAL mode, so range queries from the GUI thread
+    read committed data while the acquisition thread keeps inserting.
+    append() only queues rows; they are inserted in one transaction per
+    batch_rows values or flush_interval seconds, whichever comes first.
+    Samples are indexed by timestamp and by (device, GPIO, timestamp), so a
+    query for one GPIO over a few days reads only those rows.
+    """
+
+    def __init__(self, path='datas.db', batch_rows=2000, flush_interval=1.0):
+        """
+        :param path: Database file, created if missing
+        :param batch_rows: Values per insert transaction
+        :param flush_interval: Maximum seconds a queued value waits while samples arrive
+        """
+        self.path = path
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+        self._series = {}  # Column name -> series id
+        self._names = {}  # Series id -> column name
+        self._load_series()
+        self._pending = []  # (timestamp, series id, value)
+        self._last_flush = time.monotonic()
+
+    def _connect(self):
+        """Connection usable from any thread, guarded by our own locks"""
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL a commit survives an application crash without an fsync per batch
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _load_series(self):
+        for series_id, device, name in self._writer.execute("SELECT id, device, name FROM series"):
+            column = join_column(device, name)
+            self._series[column] = series_id
+            self._names[series_id] = column
+
+    def _series_id(self, column):
+        """Id of a column, inserting it on first use; caller holds the lock"""
+        series_id = self._series.get(column)
+        if series_id is None:
+            device, name = split_column(column)
+            series_id = self._writer.execute(
+                "INSERT INTO series (device, name) VALUES (?, ?)", (device, name)
+            ).lastrowid
+            self._series[column] = series_id
+            self._names[series_id] = column
+        return series_id
+
+    # --- Writing ---
+
+    def append(self, timestamp, values):
+        """Queue one sample; values maps column name -> number (None = missing)"""
+        with self._lock:
+            series_id = self._series_id
+            self._pending.extend(
+                (timestamp, series_id(name), value) for name, value in values.items()
+                if value is not None and value != ''
+            )
+            if len(self._pending) >= self.batch_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def append_columns(self, timestamps, columns):
+        """Queue many samples given as parallel sequences"""
+        names = list(columns)
+        for i, timestamp in enumerate(timestamps):
+            self.append(timestamp, {name: columns[name][i] for name in names})
+
+    def flush(self):
+        """Insert everything queued"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """One transaction for the queued rows; caller holds the lock"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self._writer.execute("BEGIN")
+        try:
+            self._writer.executemany("INSERT INTO samples (timestamp, series, value) VALUES (?, ?, ?)", rows)
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        """Insert what is queued and close the database"""
+        with self._lock:
+            if self._writer is None:
+                return
+            self._flush()
+            self._writer.close()
+            self._writer = None
+        with self._read_lock:
+            self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Reading ---
+
+    def columns(self, device=None):
+        """Column names stored so far, optionally of one device only"""
+        with self._lock:
+            names = list(self._series)
+        if device is not None:
+            names = [name for name in names if split_column(name)[0] == device]
+        return sorted(names)
+
+    def _where(self, start, end, columns):
+        """WHERE clause and parameters for a time range and column list"""
+        clauses = []
+        params = []
+        if columns is not None:
+            with self._lock:
+                ids = [self._series[name] for name in columns if name in self._series]
+            clauses.append(f"series IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def time_range(self, columns=None):
+        """(first, last) timestamp in epoch seconds, or None when empty"""
+        where, params = self._where(None, None, columns)
+        with self._read_lock:
+            first, last = self._reader.execute(
+                f"SELECT MIN(timestamp), MAX(timestamp) FROM samples{where}", params
+            ).fetchone()
+        return None if first is None else (first, last)
+
+    def count(self, start=None, end=None, columns=None):
+        """Number of stored values in a time range"""
+        where, params = self._where(start, end, columns)
+        with self._read_lock:
+            return self._reader.execute(f"SELECT COUNT(*) FROM samples{where}", params).fetchone()[0]
+
+    def iter_samples(self, start=None, end=None, columns=None, batch=10000):
+        """Yield (timestamp, {column: value}) in time order with start <= timestamp <= end
+
+        Rows are fetched batch at a time, so an export of a long range does
+        not hold it all in memory. The generator reads through a connection
+        of its own, so other queries can run while it is being consumed.
+        """
+        where, params = self._where(start, end, columns)
+        connection = sqlite3.connect(self.path)
+        try:
+            cursor = connection.execute(
+                f"SELECT timestamp, series, value FROM samples{where} ORDER BY timestamp, series", params
+            )
+            current_time = None
+            current = {}
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    break
+                for timestamp, series_id, value in rows:
+                    if timestamp != current_time:
+                        if current:
+                            yield current_time, current
+                        current_time, current = timestamp, {}
+                    current[self._names[series_id]] = value
+            if current:
+                yield current_time, current
+        finally:
+            connection.close()
+
+    def query(self, start=None, end=None, columns=None):
+        """Every sample with start <= timestamp <= end, in columns
+
+        :param columns: Column names to read, all when None
+        :return: (array('d') timestamps, dict name -> array('d') with NaN for missing),
+                 the same shape RecordingReader.read returns
+        """
+        names = self.columns() if columns is None else list(columns)
+        timestamps = array('d')
+        result = {name: array('d') for name in names}
+        for timestamp, values in self.iter_samples(start, end, names):
+            timestamps.append(timestamp)
+            for name, column in result.items():
+                value = values.get(name)
+                column.append(MISSING if value is None else value)
+        return timestamps, result
@@ -0,0 +1,165 @@
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# Event.wait() on Windows only wakes on the ~15 ms system tick, so the last
+# stretch before a tick is waited out in short steps instead
+_SPIN = 0.016 if sys.platform == 'win32' else 0.001
+
+
+def parse_interval(text):
+    """Seconds in an "hh:mm:ss" or "hh:mm:ss.fff" interval
+
+    :raises ValueError: on a malformed string or an interval under 1 ms
+    """
+    text = text.strip()
+    if not text:
+        raise ValueError("Time input field is empty")
+    t = datetime.strptime(text, "%H:%M:%S.%f" if "." in text else "%H:%M:%S")
+    interval = timedelta(
+        hours=t.hour, minutes=t.minute, seconds=t.second, microseconds=t.microsecond
+    ).total_seconds()
+    if interval < 0.001:
+        raise ValueError("Interval must be at least 1 ms")
+    return interval
+
+
+class SamplingScheduler:
+    """Fixed-rate ticks aligned to the monotonic clock
+
+    Tick n is due at start + n * interval, so a slow read delays one sample
+    but never shifts the ones after it. A tick that is already a whole
+    interval late is skipped and counted instead of being fired in a burst.
+    """
+
+    def __init__(self, interval_seconds, clock=time.monotonic):
+        """
+        :param interval_seconds: Tick period, fractions of a second allowed
+        :param clock: Monotonic time source in seconds
+        """
+        if interval_seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.interval = interval_seconds
+        self._clock = clock
+        self._start = None
+        self._next = 0  # Number of the next tick
+        self.ticks = 0
+        self.skipped = 0  # Ticks dropped because the loop overran
+        self.max_lateness = 0.0  # Seconds, worst delay of a fired tick
+        self.lateness = 0.0  # Seconds, delay of the last fired tick
+
+    def reset(self):
+        """Start over; the next wait() fires immediately"""
+        self._start = None
+        self._next = 0
+
+    def wait(self, stop_event=None):
+        """Sleep until the next tick is due
+
+        :param stop_event: threading.Event that aborts the wait when set
+        :return: True on a tick, False if stop_event was set
+        """
+        now = self._clock()
+        if self._start is None:
+            self._start = now
+        due = self._start + self._next * self.interval
+        if now - due >= self.interval:
+            missed = int((now - due) / self.interval)
+            self.skipped += missed
+            self._next += missed
+            due += missed * self.interval
+
+        remaining = due - now
+        if remaining > _SPIN:
+            if stop_event is not None:
+                if stop_event.wait(remaining - _SPIN):
+                    return False
+            else:
+                time.sleep(remaining - _SPIN)
+        while self._clock() < due:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            time.sleep(0)
+
+        self.lateness = self._clock() - due
+        self.max_lateness = max(self.max_lateness, self.lateness)
+        self._next += 1
+        self.ticks += 1
+        return True
+
+
+class DeviceClock:
+    """Maps the board's millis() onto host epoch time
+
+    Every frame gives offset = receipt time - device time. Transfer and
+    buffering only ever add delay, so the smallest offset seen over the last
+    `window` samples is the best estimate; samples stamped with it keep the
+    board's even spacing while staying anchored to the host clock. The
+    window lets the estimate follow slow drift between the two clocks.
+    """
+
+    WRAP = 2 ** 32  # millis() is an unsigned 32-bit counter
+
+    def __init__(self, window=512):
+        """
+        :param window: Samples over which the minimum offset is taken
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Forget the estimate, e.g. after the board restarted"""
+        self._minima = deque()  # (sample number, offset), offsets increasing
+        self._count = 0
+        self._last_raw = None
+        self._wraps = 0
+
+    @property
+    def offset(self):
+        """Host minus device time in seconds, None before the first sample"""
+        return self._minima[0][1] if self._minima else None
+
+    def timestamp(self, receipt, device_ms):
+        """Host timestamp of a sample
+
+        :param receipt: Epoch seconds when the frame arrived
+        :param device_ms: Board millis() of the sample, None if the frame had none
+        """
+        return self.timestamps([(receipt, device_ms)])[0]
+
+    def timestamps(self, samples):
+        """Host timestamps for a batch of (receipt, device ms, ...) samples
+
+        The whole batch is observed before any sample is stamped, so its
+        early samples already use the offset of the least delayed one.
+        """
+        device_times = [self._observe(sample[0], sample[1]) for sample in samples]
+        offset = self.offset
+        return [
+            sample[0] if device_time is None else device_time + offset
+            for sample, device_time in zip(samples, device_times)
+        ]
+
+    def _observe(self, receipt, device_ms):
+        """Feed one offset into the estimate; return the device time in seconds"""
+        if device_ms is None:
+            return None
+        if self._last_raw is not None and device_ms < self._last_raw:
+            if self._last_raw - device_ms > self.WRAP // 2:
+                self._wraps += 1
+            else:
+                print("⚠️ ESP32 clock went backwards, resynchronising")
+                self.reset()
+        self._last_raw = device_ms
+        device_time = (device_ms + self._wraps * self.WRAP) / 1000.0
+
+        offset = receipt - device_time
+        minima = self._minima
+        while minima and minima[-1][1] >= offset:
+            minima.pop()
+        minima.append((self._count, offset))
+        if minima[0][0] <= self._count - self.window:
+            minima.popleft()
+        self._count += 1
+        return device_time
@@ -0,0 +1,146 @@
+import time
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt6.QtWidgets import (
+    QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+    QPushButton, QTableView, QTableWidget, QTableWidgetItem
+)
+import gpio_stats
+from csv_format import DATE_FORMAT, TIME_FORMAT, format_value
+
+BUCKET_LABELS = [("Минута", 'minute'), ("Час", 'hour'), ("День", 'day')]
+ROLLING_STATS = ['mean', 'min', 'max', 'std', 'count']
+
+
+def _round(value):
+    """Shorten a statistic for display"""
+    return format_value(round(float(value), 3))
+
+
+class ResampledModel(QAbstractTableModel):
+    """Table of resample() output: one row per bucket, mean/min/max/std per GPIO"""
+
+    COLUMN_STATS = ['mean', 'min', 'max', 'std']
+
+    def __init__(self, starts, stats, parent=None):
+        super().__init__(parent)
+        self.starts = starts
+        self.stats = stats
+        self.names = sorted(stats)
+
+    def rowCount(self, parent=QModelIndex()):
+        """Number of buckets"""
+        return 0 if parent.isValid() else len(self.starts)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Date, Time and four statistics per GPIO"""
+        return 0 if parent.isValid() else 2 + len(self.names) * len(self.COLUMN_STATS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """Format a cell on demand"""
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column < 2:
+            moment = time.localtime(self.starts[row])
+            return time.strftime(DATE_FORMAT if column == 0 else TIME_FORMAT, moment)
+        name, stat = divmod(column - 2, len(self.COLUMN_STATS))
+        return _round(self.stats[self.names[name]][self.COLUMN_STATS[stat]][row])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        """Date, Time and '<GPIO> <stat>' headers"""
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation != Qt.Orientation.Horizontal:
+            return str(section + 1)
+        if section < 2:
+            return ["Date", "Time"][section]
+        name, stat = divmod(section - 2, len(self.COLUMN_STATS))
+        return f"{self.names[name]} {self.COLUMN_STATS[stat]}"
+
+
+class StatsDialog(QDialog):
+    """Rolling statistics of the live stream and bucketed averages of all data"""
+
+    def __init__(self, rolling, collect, parent=None):
+        """
+        :param rolling: gpio_stats.RollingStats fed by the main window
+        :param collect: Callable returning (timestamps, columns) NumPy arrays
+                        of everything recorded so far
+        """
+        super().__init__(parent)
+        self.rolling = rolling
+        self.collect = collect
+        self.setWindowTitle("Статистика")
+        self.resize(800, 600)
+
+        layout = QVBoxLayout()
+        self.rolling_label = QLabel(f"Последние {rolling.window} отсчётов")
+        self.rolling_label.setStyleSheet("font-weight: bold; font-size: 12pt;")
+        layout.addWidget(self.rolling_label)
+        self.rolling_table = QTableWidget(0, len(ROLLING_STATS))
+        self.rolling_table.setHorizontalHeaderLabels(ROLLING_STATS)
+        self.rolling_table.setMaximumHeight(180)
+        layout.addWidget(self.rolling_table)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Интервал"))
+        self.bucket_combo = QComboBox()
+        for label, bucket in BUCKET_LABELS:
+            self.bucket_combo.addItem(label, bucket)
+        self.bucket_combo.setCurrentIndex(1)
+        controls.addWidget(self.bucket_combo)
+        compute_btn = QPushButton("Рассчитать")
+        compute_btn.clicked.connect(self.compute)
+        controls.addWidget(compute_btn)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.resampled_table = QTableView()
+        self.resampled_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.resampled_table)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        # Rolling values change with every sample; a second is fresh enough
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh_rolling)
+        self._timer.start(1000)
+        self.refresh_rolling()
+
+    def refresh_rolling(self):
+        """Show the current rolling statistics"""
+        snapshot = self.rolling.snapshot()
+        self.rolling_table.setRowCount(len(snapshot))
+        self.rolling_table.setVerticalHeaderLabels(list(snapshot))
+        for row, stats in enumerate(snapshot.values()):
+            for column, stat in enumerate(ROLLING_STATS):
+                self.rolling_table.setItem(row, column, QTableWidgetItem(_round(stats[stat])))
+
+    def compute(self):
+        """Resample everything recorded into the selected buckets"""
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            started = time.perf_counter()
+            timestamps, columns = self.collect()
+            starts, stats = gpio_stats.resample(timestamps, columns, self.bucket_combo.currentData())
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"❌ Error computing statistics: {e}")
+            self.status_label.setText(f"Ошибка: {e}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.resampled_table.setModel(ResampledModel(starts, stats, self))
+        self.status_label.setText(f"Строк: {len(timestamps)}, интервалов: {len(starts)}, {elapsed:.2f} с")
+
+    def closeEvent(self, event):
+        """Stop refreshing while hidden"""
+        self._timer.stop()
+        super().closeEvent(event)
+
+    def showEvent(self, event):
+        """Resume refreshing"""
+        self._timer.start(1000)
+        self.refresh_rolling()
+        super().showEvent(event)
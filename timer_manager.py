@@ -1,4 +1,4 @@
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import Qt, QTimer
 
 class TimerManager:
     def __init__(self, interval_ms, callback):
@@ -7,6 +7,8 @@ class TimerManager:
         :param callback: Функция, которая будет вызываться по таймеру
         """
         self.timer = QTimer()
+        # Точный таймер: без округления интервала до ~5% (CoarseTimer)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(callback)
         self.interval_ms = interval_ms
 